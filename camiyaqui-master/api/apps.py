@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        # Clears the cached API tokens and users, and the news feeds, when they change
+        import api.authentication  # noqa
+        import api.news  # noqa
@@ -0,0 +1,80 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, permissions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from ourwedding.models import Profile
+
+
+def token_cache():
+    return caches[settings.API_TOKEN_CACHE]
+
+
+def token_cache_key(key):
+    # Tokens are credentials, they don't go into the cache as they are
+    return 'api-token:{}'.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def user_cache_key(user_id):
+    # The token cached for a user, to clear it when the user or the profile change
+    return 'api-user-token:{}'.format(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ TokenAuthentication that keeps each token, with its user and profile, in the API_TOKEN_CACHE cache for
+    API_TOKEN_CACHE_TIMEOUT seconds, so the GET requests of the app don't query the database to authenticate. The
+    cache is cleared when a token is deleted and when a user or profile is saved. It only pays off with a
+    process-local or memcached backend, a database cache would trade the query for another one.
+
+    Requests that can change data always load the token from the database: the views save request.user and its
+    profile, and a cached copy would write stale fields back.
+    """
+    def authenticate(self, request):
+        # DRF creates the authenticators for each request
+        self.use_cache = request.method in permissions.SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        token = token_cache().get(token_cache_key(key)) if getattr(self, 'use_cache', False) else None
+        if token is None:
+            try:
+                token = Token.objects.select_related('user', 'user__profile').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token_cache().set_many({token_cache_key(key): token, user_cache_key(token.user_id): token_cache_key(key)},
+                                   settings.API_TOKEN_CACHE_TIMEOUT)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return token.user, token
+
+
+def forget_user_token(user_id):
+    token_key = token_cache().get(user_cache_key(user_id))
+    if token_key:
+        token_cache().delete_many([token_key, user_cache_key(user_id)])
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    token_cache().delete_many([token_cache_key(instance.key), user_cache_key(instance.user_id)])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, **kwargs):
+    forget_user_token(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_profile(sender, instance, **kwargs):
+    forget_user_token(instance.user_id)
@@ -0,0 +1,57 @@
+""" Version stamps of the read-mostly endpoints polled by the app, for conditional GET requests. Each stamp is
+computed with at most one query, before the view serializes anything; a matching If-None-Match or
+If-Modified-Since gets a 304.
+
+Only the profile has a Last-Modified. The news and the group can change by deleting rows, which doesn't move the
+latest update time; their ETags also include the number of rows, so the app has to send If-None-Match.
+"""
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from api.news import get_feed
+from ourwedding.models import Profile
+
+
+def memoized_on_request(func):
+    """ Stores the stamp on the request, so that the ETag and the Last-Modified share a single query. """
+    attribute = '_{}'.format(func.__name__)
+
+    def wrapper(request, *args, **kwargs):
+        if not hasattr(request, attribute):
+            setattr(request, attribute, func(request, *args, **kwargs))
+        return getattr(request, attribute)
+    return wrapper
+
+
+@memoized_on_request
+def news_version(request):
+    language = request.user.profile.language
+    feed = get_feed(language)
+    # The count changes when news are deleted
+    return 'news-{}-{}-{}'.format(language, feed['count'], feed['updated'] and feed['updated'].timestamp()), None
+
+
+@memoized_on_request
+def profile_version(request):
+    # Read from the database, request.user.profile may come from the cache of the API tokens
+    updated_at = Profile.objects.filter(user_id=request.user.pk).values_list('updated_at', flat=True).get()
+    return 'profile-{}-{}'.format(request.user.pk, updated_at.timestamp()), updated_at
+
+
+@memoized_on_request
+def group_version(request):
+    profile = request.user.profile
+    if not profile.group_id:
+        return None, None
+    members = Profile.objects.filter(group_id=profile.group_id).exclude(id=profile.id).aggregate(
+        count=Count('id'), updated=Max('updated_at'))
+    return 'group-{}-{}-{}-{}'.format(request.user.pk, profile.group_id, members['count'],
+                                      members['updated'] and members['updated'].timestamp()), None
+
+
+def conditional(version):
+    """ Decorates the ``get`` of an APIView with the ETag and, if there is one, the Last-Modified of ``version``. """
+    return method_decorator(condition(etag_func=lambda request, *args, **kwargs: version(request)[0],
+                                      last_modified_func=lambda request, *args, **kwargs: version(request)[1]),
+                            name='get')
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from api.serializers import NewsSerializer
+from backend.models import News
+
+
+def cache_key(language):
+    return 'news-feed:{}'.format(language)
+
+
+def build_feed(language):
+    news = list(News.objects.filter(language=language).order_by('published_on', 'pk'))
+    return {
+        # The update time of each item is kept to filter the feed without parsing the serialized dates
+        'items': [(item.updated_on, dict(data)) for item, data in zip(news, NewsSerializer(news, many=True).data)],
+        'count': len(news),
+        'updated': max((item.updated_on for item in news), default=None),
+    }
+
+
+def get_feed(language):
+    """ The serialized news of a language, with their count and the last time one was updated. The feed is
+    cached until a news item is saved or deleted.
+    """
+    feed = cache.get(cache_key(language))
+    if feed is None:
+        feed = build_feed(language)
+        cache.set(cache_key(language), feed, settings.NEWS_FEED_TIMEOUT)
+    return feed
+
+
+def get_news(language, since=None):
+    """ The serialized news of a language, only those created or updated after ``since`` if given. """
+    return [data for updated, data in get_feed(language)['items'] if since is None or updated > since]
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_feed(sender, instance, **kwargs):
+    # The language of a news item may have changed, there are only a few feeds
+    cache.delete_many([cache_key(language) for language, name in settings.LANGUAGES])
@@ -1,15 +1,37 @@
 from django.contrib.auth.models import User
-from django.utils.http import base36_to_int
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token
 
 from backend.models import PushTokens, News
 from ourwedding.models import Profile, MessageFromGuest, Guest
-from ourwedding.tokens import login_token_generator
+from ourwedding.tokens import login_token_generator, InvalidToken, ExpiredToken
 from photos.models import FileItem
 
 
-class GuestSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """ Serializes only the fields listed in the ``fields`` query parameter, if given. """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = requested_fields(request) if request else None
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+def requested_fields(request):
+    fields = request.query_params.get('fields')
+    return {field.strip() for field in fields.split(',') if field.strip()} if fields else None
+
+
+class GuestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Model fields each serializer field needs, to load only those
+    sources = {
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'email': 'user__email',
+    }
+
     class Meta:
         model = Profile
         fields = (
@@ -109,19 +131,16 @@ class LoginSerializer(serializers.Serializer):
     access_code = serializers.CharField(max_length=255, required=True)
 
     def validate_access_code(self, code):
+        """ Returns the guest of the access code, with the profile. """
         access_code = code.lower()
         if len(access_code.split('-')) != 3:
             raise serializers.ValidationError('Wrong access code format')
-        a, b, user_pk = code.split('-')
-        user_pk = base36_to_int(user_pk)
         try:
-            user = User.objects.get(pk=user_pk)
-        except User.DoesNotExist:
-            raise serializers.ValidationError('Secret Code not Valid')
-
-        if not login_token_generator.check_token(user, code):
+            return login_token_generator.verify_token(code)
+        except ExpiredToken:
             raise serializers.ValidationError('Access Code Expired. Require a New one.')
-        return user_pk
+        except InvalidToken:
+            raise serializers.ValidationError('Secret Code not Valid')
 
 
 class RegisterSerializer(serializers.Serializer):
@@ -142,9 +161,11 @@ class APITokenSerializer(serializers.ModelSerializer):
 
 
 class PhotoSerializer(serializers.ModelSerializer):
+    rendition_urls = serializers.DictField(child=serializers.CharField(), read_only=True)
+
     class Meta:
         model = FileItem
-        fields = ('name', )
+        fields = ('name', 'rendition_urls')
 
 
 class PhotoConfirmSerializer(serializers.Serializer):
@@ -154,4 +175,4 @@ class PhotoConfirmSerializer(serializers.Serializer):
 class NewsSerializer(serializers.ModelSerializer):
     class Meta:
         model = News
-        fields = ('title', 'message', 'published_on', 'pk')
+        fields = ('title', 'message', 'published_on', 'updated_on', 'pk')
@@ -1,3 +1,184 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from backend.models import News
+from ourwedding.models import Group, Profile
+from photos.models import FileItem
+from photos.s3 import reset_s3_client
+
+
+class TestGuestViewSet(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='Carattino')
+        for n in range(30):
+            user = User.objects.create(username='guest{}@example.com'.format(n), email='guest{}@example.com'.format(n),
+                                       first_name='Guest', last_name=str(n))
+            user.profile.language = 'en' if n % 2 else 'es'
+            user.profile.is_attending = True if n % 3 else None
+            user.profile.group = self.group if n < 5 else None
+            user.profile.save()
+        self.client.force_login(User.objects.get(username='guest0@example.com'))
+
+    def test_pages_without_n_plus_one(self):
+        guests, url = [], '/api/guests/?page_size=10'
+        while url:
+            # Session, user and one query for the page
+            with self.assertNumQueries(3):
+                data = self.client.get(url).json()
+            guests.extend(data['results'])
+            url = data['next']
+        self.assertEqual(len(guests), 30)
+        self.assertEqual(guests[1]['last_name'], '1')
+
+    def test_fields_and_filters(self):
+        with self.assertNumQueries(3):
+            data = self.client.get('/api/guests/', {'fields': 'pk,email', 'language': 'en',
+                                                    'is_attending': 'true'}).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0], {'pk': 2, 'email': 'guest1@example.com'})
+        data = self.client.get('/api/guests/', {'group': self.group.pk, 'is_attending': 'null'}).json()
+        self.assertEqual([guest['last_name'] for guest in data['results']], ['0', '3'])
+        self.assertEqual(self.client.get('/api/guests/', {'is_attending': 'maybe'}).status_code, 400)
+
+
+class TestConditionalGet(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='guest@example.com', email='guest@example.com')
+        self.user.profile.language = 'en'
+        self.user.profile.save()
+        News.objects.create(language='en', title='Hello', message='Welcome!')
+        self.client.force_login(self.user)
+
+    def test_not_modified(self):
+        for url in ('/api/news', '/api/profile', '/api/guest-rsvp'):
+            etag = self.client.get(url)['ETag']
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_modified(self):
+        etag = self.client.get('/api/news')['ETag']
+        News.objects.create(language='en', title='News', message='The wedding is tomorrow')
+        self.assertEqual(self.client.get('/api/news', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get('/api/profile')['ETag']
+        self.user.first_name = 'Aquiles'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/profile', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleted_news(self):
+        """ Deleting news doesn't move the latest update, so the feed can't answer If-Modified-Since. """
+        response = self.client.get('/api/news')
+        self.assertNotIn('Last-Modified', response)
+        News.objects.get().delete()
+        response = self.client.get('/api/news', HTTP_IF_NONE_MATCH=response['ETag'],
+                                   HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 2099 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+
+class TestNewsFeed(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username='guest@example.com', email='guest@example.com')
+        user.profile.language = 'en'
+        user.profile.save()
+        self.first = News.objects.create(language='en', title='Hello', message='Welcome!')
+        News.objects.create(language='es', title='Hola', message='Bienvenidos!')
+        self.client.force_login(user)
+
+    def test_cached_feed(self):
+        self.assertEqual([news['title'] for news in self.client.get('/api/news').json()], ['Hello'])
+        # Session, user and profile, the feed comes from the cache
+        with self.assertNumQueries(3):
+            self.client.get('/api/news')
+        News.objects.create(language='en', title='News', message='The wedding is tomorrow')
+        self.assertEqual([news['title'] for news in self.client.get('/api/news').json()], ['Hello', 'News'])
+
+    def test_since(self):
+        second = News.objects.create(language='en', title='News', message='The wedding is tomorrow')
+        response = self.client.get('/api/news', {'since': self.first.updated_on.isoformat()})
+        self.assertEqual([news['pk'] for news in response.json()], [second.pk])
+        self.assertEqual(self.client.get('/api/news', {'since': 'yesterday'}).status_code, 400)
+
+
+class TestCachedTokenAuthentication(TestCase):
+    """ Queries per request of the app to /api/profile, with the configured API_TOKEN_CACHE. The first request loads
+    the token with its user and profile in one query, the next ones only read the ETag of the profile.
+    """
+    def setUp(self):
+        token_cache().clear()
+        user = User.objects.create(username='guest@example.com', email='guest@example.com')
+        self.token = Token.objects.create(user=user)
+        self.auth = {'HTTP_AUTHORIZATION': 'Token {}'.format(self.token.key)}
+
+    def test_queries_per_request(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/profile', **self.auth).status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/profile', **self.auth).status_code, 200)
+
+    def test_invalidation(self):
+        self.client.get('/api/profile', **self.auth)
+        self.token.user.profile.nickname = 'Aqui'
+        self.token.user.profile.save()
+        self.assertEqual(self.client.get('/api/profile', **self.auth).json()['profile']['nickname'], 'Aqui')
+
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/profile', **self.auth).status_code, 403)
+
+    def test_writes_load_fresh_user(self):
+        """ QuerySet.update() doesn't clear the cache, a PUT must not save the cached profile over it. """
+        self.client.get('/api/profile', **self.auth)
+        Profile.objects.filter(user=self.token.user).update(nickname='Aqui')
+        response = self.client.put('/api/guest-rsvp', {'is_attending': True}, content_type='application/json',
+                                   **self.auth)
+        self.assertEqual(response.status_code, 200)
+        profile = Profile.objects.get(user=self.token.user)
+        self.assertEqual((profile.nickname, profile.is_attending), ('Aqui', True))
+
+
+class TestPhotoBatchUploads(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='guest@example.com', email='guest@example.com')
+        self.auth = {'HTTP_AUTHORIZATION': 'Token {}'.format(Token.objects.create(user=self.user).key)}
+        reset_s3_client()
+        self.addCleanup(reset_s3_client)
+
+    @mock.patch('photos.s3.boto3.client')
+    def test_batch_policy(self, client):
+        client.return_value.generate_presigned_post.return_value = {'url': 'https://bucket', 'fields': {}}
+        names = ['photo{}.jpg'.format(n) for n in range(3)]
+        response = self.client.post('/api/photos/batch/policy', {'filenames': names}, content_type='application/json',
+                                    **self.auth)
+        self.assertEqual(response.status_code, 200)
+        files = response.json()['files']
+        self.assertEqual(len(files), 3)
+        self.assertEqual(FileItem.objects.get(pk=files[0]['file_id']).path, 'guest@example.com/{0}/{0}.jpg'.format(
+            files[0]['file_id']))
+
+        too_many = ['photo.jpg'] * (settings.PHOTOS_UPLOAD_BATCH_MAX + 1)
+        response = self.client.post('/api/photos/batch/policy', {'filenames': too_many},
+                                    content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_complete(self):
+        mine = FileItem.objects.create(user=self.user)
+        other = FileItem.objects.create(user=User.objects.create(username='other'))
+        response = self.client.post('/api/photos/batch/complete', {'file_ids': [mine.pk, other.pk]},
+                                    content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'uploaded': 1, 'missing': 1})
+        self.assertFalse(FileItem.objects.get(pk=other.pk).uploaded)
 
-# Create your tests here.
+        too_many = list(range(settings.PHOTOS_UPLOAD_BATCH_MAX + 1))
+        for data in ({'file_ids': []}, {}, {'file_ids': ['one']}, {'file_ids': too_many}):
+            with self.subTest(data=data):
+                response = self.client.post('/api/photos/batch/complete', data, content_type='application/json',
+                                            **self.auth)
+                self.assertEqual(response.status_code, 400)
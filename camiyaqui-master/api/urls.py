@@ -3,7 +3,8 @@ from rest_framework import routers
 from rest_framework.documentation import include_docs_urls
 from api import views
 from api.views import VerifyToken, RegisterView, GuestRsvp, GroupView, GuestAdd, GuestView, MessageView, \
-    LoginView, PushTokenView, RequestAccessCode, PhotoUploadPolicy, PhotoUploadComplete, NewsView
+    LoginView, PushTokenView, RequestAccessCode, PhotoUploadPolicy, PhotoUploadComplete, NewsView, \
+    PhotoBatchUploadPolicy, PhotoBatchUploadComplete
 
 router = routers.DefaultRouter()
 router.register(r'guests', views.GuestViewSet)
@@ -26,5 +27,7 @@ urlpatterns = [
     path('docs/', include_docs_urls(title='Cami y Aqui Wedding API')),
     path('photos/policy', PhotoUploadPolicy.as_view(), name='photo-policy'),
     path('photos/complete', PhotoUploadComplete.as_view(), name='photo-uploaded'),
+    path('photos/batch/policy', PhotoBatchUploadPolicy.as_view(), name='photo-batch-policy'),
+    path('photos/batch/complete', PhotoBatchUploadComplete.as_view(), name='photo-batch-uploaded'),
     path('news', NewsView.as_view(), name='news-list')
 ]
@@ -1,20 +1,21 @@
 import logging
-import os
 
-import boto3
 from django.contrib.auth.models import User
-from rest_framework import viewsets, views, status
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from rest_framework import viewsets, views, status, pagination, permissions
+from rest_framework.exceptions import ValidationError
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 
+from api.conditional import conditional, news_version, profile_version, group_version
+from api.news import get_news
 from api.serializers import GuestSerializer, TokenSerializer, RsvpSerializer, NewGuestSerializer, \
     MessageSerializer, LoginSerializer, APITokenSerializer, RegisterSerializer, UserSerializer, \
-    RequestAccessCodeSerializer, PhotoSerializer, PhotoConfirmSerializer, NewsSerializer
-from backend.models import News
-from camiyaqui.settings.aws_credentials import AWS_BUCKET_REGION, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, \
-    AWS_BUCKET_NAME
+    RequestAccessCodeSerializer, PhotoSerializer, PhotoConfirmSerializer, requested_fields
 from ourwedding.models import Profile, Group, MessageFromGuest, Guest
-from photos.models import FileItem
+from photos.serializers import BatchPolicySerializer, BatchCompleteSerializer
+from photos.uploads import create_uploads, presigned_post, complete_uploads
 
 logger = logging.getLogger(__name__)
 
@@ -46,11 +47,12 @@ class LoginView(views.APIView):
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
-            try:
-                user = User.objects.get(email=serializer.validated_data.get('email'))
-            except User.DoesNotExist:
-                return Response({'error_message': 'Email not valid'}, status=status.HTTP_404_NOT_FOUND)
-            if user.pk != serializer.validated_data.get('access_code'):
+            # The access code was checked against the guest it belongs to, it only has to match the e-mail
+            user = serializer.validated_data.get('access_code')
+            email = serializer.validated_data.get('email')
+            if user.email != email:
+                if not User.objects.filter(email=email).exists():
+                    return Response({'error_message': 'Email not valid'}, status=status.HTTP_404_NOT_FOUND)
                 return Response({'error_message': 'Access code and email don\'t match'}, status=status.HTTP_401_UNAUTHORIZED)
 
             token, _ = Token.objects.get_or_create(user=user)
@@ -87,9 +89,46 @@ class RegisterView(views.APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class GuestPagination(pagination.CursorPagination):
+    ordering = 'pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 class GuestViewSet(viewsets.ModelViewSet):
-    queryset = Profile.objects.all()
+    """ The guests, paginated with a cursor. Accepts ``?fields=`` to only get some fields and filters by
+    ``?language=``, ``?is_attending=true|false|null`` and ``?group=``.
+    """
+    queryset = Profile.objects.select_related('user')
     serializer_class = GuestSerializer
+    pagination_class = GuestPagination
+    attending_values = {'true': True, 'false': False, 'null': None}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        params = self.request.query_params
+
+        if 'language' in params:
+            queryset = queryset.filter(language=params['language'])
+        if 'is_attending' in params:
+            if params['is_attending'] not in self.attending_values:
+                raise ValidationError({'is_attending': 'Must be true, false or null'})
+            queryset = queryset.filter(is_attending=self.attending_values[params['is_attending']])
+        if 'group' in params:
+            try:
+                queryset = queryset.filter(group_id=int(params['group']))
+            except ValueError:
+                raise ValidationError({'group': 'Must be a group id'})
+
+        fields = requested_fields(self.request)
+        if fields:
+            sources = GuestSerializer.sources
+            queryset = queryset.only('user', *(sources.get(field, field) for field in fields
+                                               if field in GuestSerializer.Meta.fields and field != 'pk'))
+        return queryset
 
 
 class PushTokenView(views.APIView):
@@ -114,13 +153,12 @@ class MessageView(views.APIView):
     def post(self, request):
         serializer = MessageSerializer(data=request.data)
         if serializer.is_valid():
-            message = serializer.save()
-            message.guest = request.user
-            message.save()
+            serializer.save(guest=request.user)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@conditional(profile_version)
 class GuestView(views.APIView):
     """ View the details of the guest and allows him/her to update the information.
     """
@@ -146,6 +184,7 @@ class VerifyToken(views.APIView):
         return Response({'message': 'Token OK'})
 
 
+@conditional(profile_version)
 class GuestRsvp(views.APIView):
     """Endpoint to update the RSVP status. It is very similar to the profile endpoint, but it only allows modifying
     some of the fields on the profile of the user and not on the user account itself.
@@ -166,10 +205,11 @@ class GuestRsvp(views.APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@conditional(group_version)
 class GroupView(views.APIView):
     def get(self, request):
         try:
-            guests = request.user.profile.group.members.exclude(id=request.user.profile.id).all()
+            guests = request.user.profile.group.members.exclude(id=request.user.profile.id).select_related('user')
         except:
             return Response({'message': 'This user has no group'}, status=status.HTTP_404_NOT_FOUND)
         serializer = RsvpSerializer(guests, many=True)
@@ -206,48 +246,26 @@ class PhotoUploadPolicy(views.APIView):
         Session Authentication but any auth should work.
         """
         serializer = PhotoSerializer(data=request.data)
-        if serializer.is_valid():
-            user = request.user
-            file_obj = serializer.save()
-            file_obj.user = user
-            file_obj.save()
-        else:
+        if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        s3 = boto3.client('s3',
-                          region_name=AWS_BUCKET_REGION,
-                          aws_access_key_id=AWS_ACCESS_KEY_ID,
-                          aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
-
-        username_str = str(user.username)
-        file_obj_id = file_obj.id
-        upload_start_path = f"{username_str}/{file_obj_id}/"
-
-        _, file_extension = os.path.splitext(serializer.validated_data.get('name'))
-
-        filename_final = f"{file_obj_id}{file_extension}"
-
-        final_upload_path = f"{upload_start_path}{filename_final}"
+        file_obj = create_uploads(request.user, [serializer.validated_data.get('name')])[0]
+        data = {'policy': presigned_post(file_obj),
+                'file_id': file_obj.id
+                }
 
-        file_obj.path = final_upload_path
-        file_obj.extension = file_extension[1:]
-        file_obj.save()
+        return Response(data, status=status.HTTP_200_OK)
 
-        presigned_post = s3.generate_presigned_post(
-            Bucket=AWS_BUCKET_NAME,
-            Key=final_upload_path,
-            Fields={"acl": "private", "Content-Type": ""},
-            Conditions=[
-                {"acl": "private"},
-                {"Content-Type": ""}
-            ],
-            ExpiresIn=3600
-        )
 
-        data = {'policy': presigned_post,
-                'file_id': file_obj_id
-                }
+class PhotoBatchUploadPolicy(views.APIView):
+    """ The upload policies of several photos at once. """
+    def post(self, request, *args, **kwargs):
+        serializer = BatchPolicySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        files = create_uploads(request.user, serializer.validated_data.get('filenames'))
+        data = {'files': [{'policy': presigned_post(file_obj), 'file_id': file_obj.id} for file_obj in files]}
         return Response(data, status=status.HTTP_200_OK)
 
 
@@ -256,20 +274,37 @@ class PhotoUploadComplete(views.APIView):
         serializer = PhotoConfirmSerializer(data=request.data)
         if serializer.is_valid():
             file_id = serializer.validated_data.get('file_id')
-            try:
-                file = FileItem.objects.get(id=file_id)
-            except FileItem.DoesNotExist:
+            if not complete_uploads(request.user, [file_id]):
                 return Response(status=status.HTTP_404_NOT_FOUND)
-            file.uploaded = True
-            file.save()
-            data = PhotoSerializer(file)
-            return Response(data, status=status.HTTP_202_ACCEPTED)
+            return Response({'file_id': file_id, 'uploaded': True}, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PhotoBatchUploadComplete(views.APIView):
+    def post(self, request, *args, **kwargs):
+        serializer = BatchCompleteSerializer(data=request.data)
+        if serializer.is_valid():
+            file_ids = set(serializer.validated_data.get('file_ids'))
+            uploaded = complete_uploads(request.user, file_ids)
+            return Response({'uploaded': uploaded, 'missing': len(file_ids) - uploaded}, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@conditional(news_version)
 class NewsView(views.APIView):
+    """ The news in the language of the guest. ``?since=`` with a date and time only returns the news created or
+    updated after it.
+    """
     def get(self, request):
-        queryset = News.objects.filter(language=request.user.profile.language)
-        serializer = NewsSerializer(queryset, many=True)
-        return Response(serializer.data)
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({'since': 'Must be a date and time'}, status=status.HTTP_400_BAD_REQUEST)
+            if is_naive(since):
+                since = make_aware(since)
+        return Response(get_news(request.user.profile.language, since))
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from backend.models import InternalMessage, PushTokens, Message, SentMessages, Visits
+from backend.models import InternalMessage, PushTokens, Message, SentMessages, Visits, EmailJob, OutgoingEmail, \
+    News
 
-admin.site.register((Message, SentMessages, InternalMessage, PushTokens, Visits))
\ No newline at end of file
+admin.site.register((Message, SentMessages, InternalMessage, PushTokens, Visits, EmailJob, OutgoingEmail, News))
\ No newline at end of file
@@ -0,0 +1,75 @@
+import csv
+import json
+import zlib
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+
+USER_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active', 'is_superuser', 'last_login',
+    'date_joined',
+)
+PROFILE_FIELDS = (
+    'nickname', 'language', 'phone', 'invited_by', 'group', 'is_attending', 'is_child', 'receive_updates',
+    'last_login', 'has_car', 'needs_van', 'dietary_restrictions', 'comes_from', 'pre_wedding', 'post_wedding',
+)
+FIELDS = USER_FIELDS + tuple('profile__' + field for field in PROFILE_FIELDS)
+
+# Content type and file extension of each format
+FORMATS = {
+    'json': ('application/json', 'json'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+class Echo:
+    """ File-like object that returns what is written, to stream the output of csv.writer. """
+    def write(self, value):
+        return value
+
+
+def guest_rows(chunk_size=500):
+    """ The guests and their profiles, fetched from the database in chunks. """
+    return User.objects.order_by('pk').values(*FIELDS).iterator(chunk_size=chunk_size)
+
+
+def to_json(rows):
+    yield '['
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + json.dumps(row, cls=DjangoJSONEncoder)
+    yield ']'
+
+
+def to_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def to_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_guests(export_format='json', compress=False, chunk_size=500):
+    """ Generates the export of all the guests, as bytes, without loading the whole table in memory. """
+    serializers = {'json': to_json, 'jsonl': to_jsonl, 'csv': to_csv}
+    chunks = (chunk.encode('utf-8') for chunk in serializers[export_format](guest_rows(chunk_size)))
+    if compress:
+        chunks = gzipped(chunks)
+    return chunks
+
+
+def export_filename(export_format, compress=False):
+    return 'guests.{}{}'.format(FORMATS[export_format][1], '.gz' if compress else '')
@@ -0,0 +1,91 @@
+import csv
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from ourwedding.models import Profile
+from ourwedding.rsvp import contribution, apply_delta, COUNTERS
+
+REQUIRED_COLUMNS = ('email', 'first_name', 'last_name', 'language')
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.duplicates = []  # (line, email) of the guests already invited or repeated in the file
+        self.invalid = []  # (line, reason)
+
+    def __str__(self):
+        return 'Created {} guests, skipped {} duplicates and {} invalid rows'.format(
+            self.created, len(self.duplicates), len(self.invalid))
+
+
+def clean_row(row):
+    """ Returns the cleaned values of a CSV row, raises ValidationError if the row can't be imported. """
+    values = {column: (row.get(column) or '').strip() for column in REQUIRED_COLUMNS}
+    validate_email(values['email'])
+    for column in ('email', 'first_name', 'last_name'):
+        max_length = User._meta.get_field(column).max_length
+        if len(values[column]) > max_length:
+            raise ValidationError('{} is longer than {} characters'.format(column, max_length))
+    if values['language'] not in dict(settings.LANGUAGES):
+        raise ValidationError('Unknown language "{}"'.format(values['language']))
+    return values
+
+
+def create_guests(rows):
+    """ Creates the users and their profiles with one INSERT each. bulk_create doesn't send post_save, so the
+    profiles and the RSVP counters are created here instead of by the signal receivers.
+    """
+    users = User.objects.bulk_create([
+        User(username=row['email'], email=row['email'], first_name=row['first_name'], last_name=row['last_name'])
+        for row in rows
+    ])
+    if users and users[0].pk is None:
+        # Only some databases return the ids of the rows inserted by bulk_create
+        ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+        for user in users:
+            user.pk = ids[user.username]
+    profiles = Profile.objects.bulk_create([
+        Profile(user_id=user.pk, language=row['language']) for user, row in zip(users, rows)
+    ])
+    contributions = [contribution(profile) for profile in profiles]
+    apply_delta({counter: sum(c[counter] for c in contributions) for counter in COUNTERS})
+    return len(users)
+
+
+def import_contacts(csv_file, batch_size=500):
+    """ Invites the guests of a CSV file with email, first_name, last_name and language columns. The existing
+    e-mails are fetched with one query and the guests are created in batches, all in a single transaction.
+    """
+    report = ImportReport()
+    reader = csv.DictReader(csv_file)
+    missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        report.invalid.append((1, 'Missing columns: {}'.format(', '.join(sorted(missing)))))
+        return report
+
+    seen = {email.lower() for email in User.objects.values_list('email', flat=True)}
+    batch = []
+    with transaction.atomic():
+        # Line 1 is the header
+        for line, row in enumerate(reader, start=2):
+            try:
+                values = clean_row(row)
+            except ValidationError as e:
+                report.invalid.append((line, '; '.join(e.messages)))
+                continue
+            if values['email'].lower() in seen:
+                report.duplicates.append((line, values['email']))
+                continue
+            seen.add(values['email'].lower())
+            batch.append(values)
+            if len(batch) >= batch_size:
+                report.created += create_guests(batch)
+                batch = []
+        if batch:
+            report.created += create_guests(batch)
+    return report
@@ -1,19 +1,22 @@
-import json
-
-from io import StringIO
-
 from django.conf import settings
-from django.contrib.auth.models import User
 from django.core.mail import EmailMessage
 from django.core.management import BaseCommand
-from django.core.serializers.json import DjangoJSONEncoder
+
+from backend.export import export_guests, export_filename, FORMATS
 
 
 class Command(BaseCommand):
+    help = "E-mails a backup of all the guests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', default=False)
+
     def handle(self, *args, **options):
-        data = list(User.objects.values())
-        jsonfile = StringIO()
-        jsonfile.write(json.dumps(data, cls=DjangoJSONEncoder))
+        export_format, compress = options['format'], options['gzip']
+        content = b''.join(export_guests(export_format, compress))
+
+        mimetype = 'application/gzip' if compress else FORMATS[export_format][0]
         message = EmailMessage("Exported Guests", "Here is the backup of the guests", settings.EMAIL_FROM, [settings.EMAIL_FROM])
-        message.attach('guests.csv', jsonfile.getvalue(), 'text/csv')
+        message.attach(export_filename(export_format, compress), content, mimetype)
         message.send()
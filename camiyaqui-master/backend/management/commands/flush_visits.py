@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+
+from backend.visits import load_spooled_visits
+
+
+class Command(BaseCommand):
+    help = "Stores the page visits spooled to disk by web server processes that couldn't store them on shutdown. " \
+           "Visits still buffered by a running process can only be flushed by that process."
+
+    def handle(self, *args, **options):
+        loaded = load_spooled_visits()
+        self.stdout.write('Stored {} spooled visits'.format(loaded))
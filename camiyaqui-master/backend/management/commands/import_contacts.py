@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from backend.importer import import_contacts
+
+
+class Command(BaseCommand):
+    help = "Invites the guests of a CSV file with email, first_name, last_name and language columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with open(options['file'], 'r', encoding='utf-8', newline='') as csv_file:
+            report = import_contacts(csv_file, batch_size=options['batch_size'])
+        for line, email in report.duplicates:
+            self.stdout.write('Line {}: {} is already invited'.format(line, email))
+        for line, reason in report.invalid:
+            self.stderr.write('Line {}: {}'.format(line, reason))
+        self.stdout.write(str(report))
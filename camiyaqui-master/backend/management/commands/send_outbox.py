@@ -0,0 +1,29 @@
+import time
+
+from django.core.management import BaseCommand
+
+from backend.outbox import queue_jobs, send_queued, finish_jobs
+from ourwedding.notifications import send_digest
+
+
+class Command(BaseCommand):
+    help = "Delivers the e-mails waiting in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Number of sending threads")
+        parser.add_argument('--batch-size', type=int, default=50, help="E-mails sent per connection")
+        parser.add_argument('--loop', action='store_true', default=False,
+                            help="Keep running and check the outbox every --interval seconds")
+        parser.add_argument('--interval', type=int, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            send_digest()
+            queued = queue_jobs()
+            sent = send_queued(workers=options['workers'], batch_size=options['batch_size'])
+            finish_jobs()
+            if queued or sent:
+                self.stdout.write('Queued {} and sent {} e-mails'.format(queued, sent))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -1,6 +1,4 @@
-from django.contrib.auth.models import User
-
-from .models import Visits
+from .visits import visit_recorder
 
 
 class PageViewMiddleware:
@@ -11,9 +9,6 @@ class PageViewMiddleware:
         response = self.get_response(request)
 
         if request.session.get('guest'):
-            Visits.objects.create(
-                guest=User.objects.get(pk=request.session.get('guest')),
-                page=request.path,
-            )
+            visit_recorder.record(request.session.get('guest'), request.path)
 
         return response
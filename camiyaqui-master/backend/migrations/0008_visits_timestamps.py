@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0007_pushtokens_active'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visits',
+            name='timestamps',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
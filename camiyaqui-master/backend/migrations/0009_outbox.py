@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0008_visits_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('queued', models.BooleanField(default=False)),
+                ('finished_on', models.DateTimeField(default=None, null=True)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='backend.Message')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('body_html', models.TextField(blank=True, null=True)),
+                ('from_email', models.CharField(max_length=255)),
+                ('to', models.TextField()),
+                ('bcc', models.TextField(blank=True)),
+                ('reply_to', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sent', 'Sent'), ('failed', 'Failed')], db_index=True, default='queued', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('sent_on', models.DateTimeField(default=None, null=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='backend.EmailJob')),
+            ],
+        ),
+    ]
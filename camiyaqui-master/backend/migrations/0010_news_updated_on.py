@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+def updated_on_from_published_on(apps, schema_editor):
+    News = apps.get_model('backend', 'News')
+    News.objects.update(updated_on=models.F('published_on'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0009_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(updated_on_from_published_on, migrations.RunPython.noop),
+    ]
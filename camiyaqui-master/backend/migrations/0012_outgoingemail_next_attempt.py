@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0011_outgoingemail_recipient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='next_attempt',
+            field=models.DateTimeField(default=None, null=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+
 from django.contrib.auth.models import User
 from django.urls import reverse
 
@@ -6,12 +8,17 @@ from ourwedding.models import Profile
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.db import models
+from django.db.models import Count, Q, Exists, OuterRef
 from django.template import Template, Context
 from django.utils.text import slugify
+from django.utils.timezone import now
 
 from ourwedding.models import Profile
 from ourwedding.tokens import login_token_generator
 
+# Compiled templates of each message, {message pk: (content hash, text template, html template)}
+_compiled_templates = {}
+
 
 class Message(models.Model):
     slug = models.SlugField(max_length=255, unique=True)
@@ -29,48 +36,94 @@ class Message(models.Model):
         sent_to = SentMessages.objects.filter(message=self).distinct()
         return sent_to
 
-    def send(self, guest, context={}, check_language=True):
-        if check_language and self.language != guest.profile.language:
-            raise Exception('Trying to send a message to {} in {}'.format(guest, self.language))
+    def compiled_templates(self):
+        """ Returns the text and html templates of the message. They are parsed only once and kept until the
+        message is saved or its content changes, so sending to many guests doesn't parse them for each one.
+        """
+        content = '{}\0{}'.format(self.template_txt, self.template_html or '')
+        content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        cached = _compiled_templates.get(self.pk)
+        if cached and cached[0] == content_hash:
+            return cached[1:]
+
+        tmpl_txt = Template(self.template_txt)
+        tmpl_html = Template(self.template_html) if self.template_html else None
+        if self.pk:
+            _compiled_templates[self.pk] = (content_hash, tmpl_txt, tmpl_html)
+        return tmpl_txt, tmpl_html
 
+    def render(self, guest, context=None):
+        """ Builds the e-mail for the given guest. """
+        context = dict(context or {})
         context.update({'guest': guest})
         context.update({'token': login_token_generator.make_token(guest)})
         context.update({'website': settings.WEBSITE_URL})
         context = Context(context)
 
-        tmpl_txt = Template(self.template_txt)
+        tmpl_txt, tmpl_html = self.compiled_templates()
 
         msg_txt = tmpl_txt.render(context=context)
         msg = EmailMultiAlternatives(self.subject, msg_txt, settings.EMAIL_FROM, [guest.email],
                                      reply_to=[settings.EMAIL_FROM])
-        if self.template_html:
-            tmpl_html = Template(self.template_html)
+        if tmpl_html:
             msg_html = tmpl_html.render(context=context)
             msg.attach_alternative(msg_html, 'text/html')
+        return msg
 
+    def send(self, guest, context={}, check_language=True):
+        """ Sends the message right away, used for testing a message before sending it to everyone. """
+        if check_language and self.language != guest.profile.language:
+            raise Exception('Trying to send a message to {} in {}'.format(guest, self.language))
+
+        msg = self.render(guest, context)
         if SentMessages.objects.filter(sent_to=guest, message=self).exists():
             print(f'Sending message {self.subject} again to {guest}')
         else:
             print(f'Sending message {self.subject} to {guest}')
         msg.send()
-        SentMessages.objects.create(message=self, sent_to=guest, text=msg_txt)
+        SentMessages.objects.create(message=self, sent_to=guest, text=msg.body)
+
+    def pending_recipients(self):
+        """ Users with the language of the message who didn't receive it yet and aren't waiting for it in the
+        outbox, computed in a single query. The users whose e-mail failed are recipients again.
+        """
+        sent = SentMessages.objects.filter(message=self, sent_to=OuterRef('pk'))
+        queued = OutgoingEmail.objects.filter(message=self, recipient=OuterRef('pk'), status=OutgoingEmail.QUEUED)
+        return User.objects.filter(profile__language=self.language).annotate(
+            already_sent=Exists(sent), already_queued=Exists(queued)).filter(
+            already_sent=False, already_queued=False).select_related('profile').order_by('pk')
 
-    def send_all(self):
-        """Send this message to all the users provided that the language is the same.
-        It will not send the message twice to the same person.
+    def send_all(self, job=None, dry_run=False, batch_size=100):
+        """Queue this message in the outbox for all the users provided that the language is the same.
+        It will not send the message twice to the same person. With dry_run it only returns how many
+        people would receive it.
         """
+        recipients = self.pending_recipients()
+        if dry_run:
+            return recipients.count()
 
-        users = User.objects.filter(profile__language=self.language)
         i = 0
-        for user in users:
-            if SentMessages.objects.filter(message=self, sent_to=user).count() == 0:
-                self.send(user)
-                i += 1
+        batch = []
+        for user in recipients.iterator(chunk_size=batch_size):
+            batch.append(user)
+            if len(batch) == batch_size:
+                i += self._queue_batch(batch, job)
+                batch = []
+        if batch:
+            i += self._queue_batch(batch, job)
         return i
 
+    def _queue_batch(self, users, job):
+        from backend.outbox import queue_emails
+
+        # SentMessages are recorded by the outbox once each e-mail is delivered
+        queue_emails([self.render(user) for user in users], job=job, message=self, recipients=users)
+        return len(users)
+
     def save(self, *args, **kwargs):
         self.slug = slugify(self.subject)
         super(Message, self).save(*args, **kwargs)
+        _compiled_templates.pop(self.pk, None)
 
     def __str__(self):
         return "{} [{}]".format(self.subject, self.language)
@@ -86,6 +139,88 @@ class SentMessages(models.Model):
     text = models.TextField()
 
 
+class EmailJob(models.Model):
+    """ Sending a Message to all the guests. The job is created by the backend and the send_outbox command
+    queues the e-mails and delivers them, so the request that created it doesn't wait for the mail server.
+    """
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='jobs')
+    created = models.DateTimeField(auto_now_add=True)
+    queued = models.BooleanField(default=False)  # If the e-mails were added to the outbox
+    finished_on = models.DateTimeField(default=None, null=True)
+
+    def progress(self):
+        progress = self.emails.aggregate(
+            total=Count('id'),
+            sent=Count('id', filter=Q(status=OutgoingEmail.SENT)),
+            failed=Count('id', filter=Q(status=OutgoingEmail.FAILED)),
+        )
+        progress.update({'job': self.pk, 'queued': self.queued, 'finished': self.finished_on is not None})
+        return progress
+
+    def __str__(self):
+        return "Sending {}".format(self.message)
+
+
+class OutgoingEmail(models.Model):
+    """ E-mails waiting to be delivered by the send_outbox command. """
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    job = models.ForeignKey(EmailJob, on_delete=models.CASCADE, related_name='emails', null=True, blank=True)
+    # The Message and guest of the e-mail, to record it in SentMessages once it's delivered
+    message = models.ForeignKey(Message, on_delete=models.SET_NULL, related_name='emails', null=True, blank=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='emails', null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    body_html = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=255)
+    to = models.TextField()  # One address per line
+    bcc = models.TextField(blank=True)
+    reply_to = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    next_attempt = models.DateTimeField(default=None, null=True)  # When a failed e-mail is retried
+    sent_on = models.DateTimeField(default=None, null=True)
+
+    @classmethod
+    def from_message(cls, msg, job=None, message=None, recipient=None):
+        body_html = None
+        for content, mimetype in getattr(msg, 'alternatives', []):
+            if mimetype == 'text/html':
+                body_html = content
+        return cls(
+            job=job,
+            message=message,
+            recipient=recipient,
+            subject=msg.subject,
+            body=msg.body,
+            body_html=body_html,
+            from_email=msg.from_email,
+            to='\n'.join(msg.to),
+            bcc='\n'.join(msg.bcc),
+            reply_to='\n'.join(msg.reply_to),
+        )
+
+    def as_message(self, connection=None):
+        msg = EmailMultiAlternatives(self.subject, self.body, self.from_email, self.to.splitlines(),
+                                     bcc=self.bcc.splitlines(), reply_to=self.reply_to.splitlines(),
+                                     connection=connection)
+        if self.body_html:
+            msg.attach_alternative(self.body_html, 'text/html')
+        return msg
+
+    def __str__(self):
+        return "{} to {} [{}]".format(self.subject, self.to.replace('\n', ', '), self.status)
+
+
 class InternalMessage(models.Model):
     """ Messages generated internally, for example if someone registers and we need to manually
     verify the information."""
@@ -109,7 +244,7 @@ class PushTokens(models.Model):
 
 class Visits(models.Model):
     guest = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visits')
-    timestamps = models.DateTimeField(auto_now_add=True)
+    timestamps = models.DateTimeField(default=now)  # Set when visiting, visits are stored in batches
     page = models.CharField(max_length=255)
 
     def __str__(self):
@@ -121,3 +256,4 @@ class News(models.Model):
     title = models.CharField(max_length=120, blank=False, null=False)
     message = models.TextField()
     published_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
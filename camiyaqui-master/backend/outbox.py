@@ -0,0 +1,110 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connection as db_connection
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from backend.models import EmailJob, OutgoingEmail, SentMessages
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(msg, job=None):
+    """ Stores an EmailMessage in the outbox, it will be delivered by the send_outbox command. """
+    email = OutgoingEmail.from_message(msg, job=job)
+    email.save()
+    return email
+
+
+def queue_emails(msgs, job=None, message=None, recipients=None):
+    """ Stores several EmailMessages with one INSERT. The e-mails of a Message are given its recipients, one per
+    e-mail, so they are recorded in SentMessages when delivered.
+    """
+    recipients = recipients or [None] * len(msgs)
+    return OutgoingEmail.objects.bulk_create([
+        OutgoingEmail.from_message(msg, job=job, message=message, recipient=recipient)
+        for msg, recipient in zip(msgs, recipients)
+    ])
+
+
+def queue_jobs():
+    """ Adds to the outbox the e-mails of the jobs created from the backend. Returns the number of e-mails queued.
+    """
+    total = 0
+    for job in EmailJob.objects.filter(queued=False).select_related('message'):
+        total += job.message.send_all(job=job)
+        job.queued = True
+        job.save()
+    return total
+
+
+def finish_jobs():
+    EmailJob.objects.filter(queued=True, finished_on=None).exclude(
+        emails__status=OutgoingEmail.QUEUED).update(finished_on=now())
+
+
+def _send_batch(email_ids):
+    """ Sends a batch of e-mails over a single connection to the mail server. Runs in a worker thread.
+    Each e-mail is sent and tracked on its own, so a failure doesn't retry the ones already delivered. An e-mail
+    that fails is retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubled after every attempt.
+    """
+    try:
+        emails = list(OutgoingEmail.objects.filter(id__in=email_ids, status=OutgoingEmail.QUEUED))
+        sent, errors = [], {}
+        connection = get_connection()
+        try:
+            connection.open()
+            for email in emails:
+                try:
+                    connection.send_messages([email.as_message(connection=connection)])
+                except Exception as e:
+                    errors[email] = str(e)
+                else:
+                    sent.append(email)
+        except Exception as e:
+            # The mail server couldn't be reached
+            errors = {email: str(e) for email in emails}
+        finally:
+            connection.close()
+
+        if sent:
+            OutgoingEmail.objects.filter(id__in=[email.id for email in sent]).update(
+                status=OutgoingEmail.SENT, sent_on=now(), attempts=F('attempts') + 1)
+            SentMessages.objects.bulk_create([
+                SentMessages(message_id=email.message_id, sent_to_id=email.recipient_id, text=email.body)
+                for email in sent if email.message_id and email.recipient_id
+            ])
+        if errors:
+            logger.error('Failed sending {} of {} e-mails'.format(len(errors), len(emails)))
+            by_error = {}
+            for email, error in errors.items():
+                by_error.setdefault((error, email.attempts), []).append(email.id)
+            for (error, attempts), ids in by_error.items():
+                next_attempt = now() + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** attempts)
+                OutgoingEmail.objects.filter(id__in=ids).update(attempts=F('attempts') + 1, error=error,
+                                                                next_attempt=next_attempt)
+            OutgoingEmail.objects.filter(id__in=[email.id for email in errors],
+                                         attempts__gte=settings.EMAIL_OUTBOX_MAX_ATTEMPTS).update(
+                status=OutgoingEmail.FAILED)
+        return len(sent)
+    finally:
+        db_connection.close()
+
+
+def send_queued(workers=4, batch_size=50):
+    """ Delivers the e-mails waiting in the outbox. Each worker thread sends a batch of e-mails over one
+    connection to the mail server. Only one process should be sending at any given time. E-mails that failed
+    are left out until their next attempt is due.
+    Returns the number of e-mails sent.
+    """
+    email_ids = list(OutgoingEmail.objects.filter(status=OutgoingEmail.QUEUED).filter(
+        Q(next_attempt=None) | Q(next_attempt__lte=now())).order_by('id').values_list('id', flat=True))
+    batches = [email_ids[i:i + batch_size] for i in range(0, len(email_ids), batch_size)]
+    if not batches:
+        return 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(_send_batch, batches))
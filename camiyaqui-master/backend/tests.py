@@ -1,3 +1,254 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import DatabaseError
+from django.template import Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from backend.importer import import_contacts
+from backend.models import Message, SentMessages, OutgoingEmail, Visits
+from backend.outbox import _send_batch, send_queued
+from backend.visits import VisitRecorder, spool, load_spooled_visits
+from ourwedding.rsvp import get_summary
+
+
+class TestSendAll(TestCase):
+    def setUp(self):
+        self.message = Message.objects.create(language='es', subject='Save the date',
+                                              template_txt='Hola {{ guest.first_name }}')
+        for i in range(5):
+            User.objects.create(username='guest{}@mail.com'.format(i), email='guest{}@mail.com'.format(i),
+                                first_name='Guest {}'.format(i))
+        english = User.objects.create(username='english@mail.com', email='english@mail.com')
+        english.profile.language = 'en'
+        english.profile.save()
+
+    def test_dry_run(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.message.send_all(dry_run=True), 5)
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_send_all_queries(self):
+        """ The recipients are planned in one query and queued with one bulk INSERT per batch. They are recorded
+        in SentMessages only when the e-mails are delivered.
+        """
+        with self.assertNumQueries(1 + 3):
+            self.assertEqual(self.message.send_all(batch_size=2), 5)
+        self.assertEqual(OutgoingEmail.objects.filter(message=self.message).count(), 5)
+        self.assertFalse(SentMessages.objects.exists())
+
+    def test_not_sent_twice(self):
+        self.message.send_all()
+        User.objects.create(username='late@mail.com', email='late@mail.com')
+        self.assertEqual(self.message.send_all(), 1)
+        self.assertEqual(OutgoingEmail.objects.filter(to='late@mail.com').count(), 1)
+
+    def test_templates_parsed_once(self):
+        self.message.template_html = '<p>Hola {{ guest.first_name }}</p>'
+        self.message.save()
+        with mock.patch('backend.models.Template', wraps=Template) as template:
+            self.message.send_all()
+            self.assertEqual(template.call_count, 2)
+            self.message.template_txt = 'Hello {{ guest.first_name }}'
+            self.message.save()
+            self.message.compiled_templates()
+            self.assertEqual(template.call_count, 4)
+
+
+
+class TestOutboxDelivery(TestCase):
+    def setUp(self):
+        self.message = Message.objects.create(language='es', subject='Save the date', template_txt='Hola')
+        for i in range(3):
+            User.objects.create(username='guest{}@mail.com'.format(i), email='guest{}@mail.com'.format(i))
+        self.message.send_all()
+
+    def deliver(self, failing=()):
+        """ Delivers the queued e-mails with the locmem backend, the e-mails to the failing addresses raise. """
+        connection = locmem.EmailBackend()
+        send_messages = connection.send_messages
+
+        def send_or_fail(messages):
+            if messages[0].to[0] in failing:
+                raise SMTPException('Mailbox unavailable')
+            return send_messages(messages)
+
+        # The worker closes its database connection, which would break the test transaction
+        with mock.patch('backend.outbox.db_connection'), \
+                mock.patch('backend.outbox.get_connection', return_value=connection), \
+                mock.patch.object(connection, 'send_messages', side_effect=send_or_fail), \
+                self.assertLogs('backend.outbox', 'ERROR') if failing else nullcontext():
+            return _send_batch(list(OutgoingEmail.objects.values_list('id', flat=True)))
+
+    def test_partial_failure(self):
+        self.assertEqual(self.deliver(failing=['guest0@mail.com']), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(self.message.sent_to.count(), 2)
+        failed = OutgoingEmail.objects.get(recipient__email='guest0@mail.com')
+        self.assertEqual((failed.status, failed.attempts, failed.error),
+                         (OutgoingEmail.QUEUED, 1, 'Mailbox unavailable'))
+
+        # Only the e-mail that failed is sent again
+        self.assertEqual(self.deliver(), 1)
+        self.assertEqual([msg.to for msg in mail.outbox[2:]], [['guest0@mail.com']])
+        self.assertEqual(self.message.sent_to.count(), 3)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=1)
+    def test_failed_emails_queued_again(self):
+        self.deliver(failing=['guest0@mail.com'])
+        self.assertEqual(OutgoingEmail.objects.get(recipient__email='guest0@mail.com').status, OutgoingEmail.FAILED)
+        self.assertFalse(self.message.sent_to.filter(sent_to__email='guest0@mail.com').exists())
+        self.assertEqual(self.message.send_all(), 1)
+
+    @override_settings(EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_retry_backoff(self):
+        self.deliver(failing=['guest0@mail.com'])
+        failed = OutgoingEmail.objects.get(recipient__email='guest0@mail.com')
+        self.assertAlmostEqual((failed.next_attempt - now()).total_seconds(), 60, delta=5)
+
+        with mock.patch('backend.outbox._send_batch', return_value=0) as send_batch:
+            self.assertEqual(send_queued(), 0)
+            send_batch.assert_not_called()
+            OutgoingEmail.objects.filter(id=failed.id).update(next_attempt=now())
+            send_queued()
+            send_batch.assert_called_once_with([failed.id])
+
+        # The delay doubles with every attempt
+        OutgoingEmail.objects.filter(id=failed.id).update(next_attempt=None)
+        self.deliver(failing=['guest0@mail.com'])
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, 2)
+        self.assertAlmostEqual((failed.next_attempt - now()).total_seconds(), 120, delta=5)
+
+
+
+class TestGuestList(TestCase):
+    def setUp(self):
+        staff = User.objects.create(username='staff@mail.com', email='staff@mail.com', is_staff=True)
+        self.client.force_login(staff)
+        for i in range(5):
+            guest = User.objects.create(username='guest{}@mail.com'.format(i), email='guest{}@mail.com'.format(i),
+                                        first_name='Guest', last_name='Number {}'.format(i))
+            guest.profile.invited_by = staff
+            guest.profile.save()
+        get_summary()
+
+    def get_page(self, page, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(reverse('bcknd-guest-list'), data={'page': page})
+            self.assertEqual(response.status_code, 200)
+        return response.context['guests_approved']
+
+    @mock.patch('backend.views.GuestList.paginate_by', 2)
+    def test_paginated(self):
+        """ The profiles and their inviters are loaded with the guests, so the queries don't grow with the page.
+        """
+        # Session and user, the RSVP summary, the count and the page of guests, the guests waiting and the children
+        first = self.get_page(1, 7)
+        self.assertEqual([guest.last_name for guest in first], ['', 'Number 0'])
+        last = self.get_page(3, 7)
+        self.assertEqual([guest.last_name for guest in last], ['Number 3', 'Number 4'])
+        self.assertEqual(last.paginator.num_pages, 3)
+        # Out of range pages show the last one
+        self.assertEqual(list(self.get_page(9, 7)), list(last))
+
+
+class TestExportGuests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create(username='staff@mail.com', email='staff@mail.com', is_staff=True))
+
+    def test_gzip_parameter(self):
+        for value, content_type in (('1', 'application/gzip'), ('true', 'application/gzip'),
+                                    ('0', 'application/json'), ('false', 'application/json')):
+            with self.subTest(gzip=value):
+                response = self.client.get(reverse('export-guests'), data={'gzip': value})
+                self.assertEqual(response['Content-Type'], content_type)
+        self.assertEqual(self.client.get(reverse('export-guests'), data={'gzip': 'maybe'}).status_code, 400)
+
+    def test_invalid_parameters_not_reflected(self):
+        for data in ({'format': '<script>alert(1)</script>'}, {'gzip': '<script>alert(1)</script>'}):
+            with self.subTest(data=data):
+                response = self.client.get(reverse('export-guests'), data=data)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response['Content-Type'], 'text/plain')
+                self.assertNotIn(b'<script>', response.content)
+
+
+class TestImportContacts(TestCase):
+    CSV = (
+        'email,first_name,last_name,language\n'
+        'ana@example.com,Ana,Lopez,es\n'
+        'old@example.com,Old,Friend,en\n'
+        'not-an-email,Bad,Row,en\n'
+        'ANA@example.com,Ana,Again,es\n'
+        'bob@example.com,Bob,Smith,xx\n'
+        'carl@example.com,Carl,Jones,en\n'
+    )
+
+    def setUp(self):
+        User.objects.create(username='old@example.com', email='old@example.com')
+        get_summary()
+
+    def test_import(self):
+        with self.assertNumQueries(7):
+            report = import_contacts(io.StringIO(self.CSV))
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.duplicates, [(3, 'old@example.com'), (5, 'ANA@example.com')])
+        self.assertEqual([line for line, reason in report.invalid], [4, 6])
+        self.assertEqual(User.objects.get(email='carl@example.com').profile.language, 'en')
+        self.assertEqual(get_summary().unsure, 3)
+
+
+@override_settings(VISITS_BATCH_SIZE=50, VISITS_FLUSH_INTERVAL=3600, VISITS_BUFFER_MAX=3)
+class TestVisitRecorder(TestCase):
+    def setUp(self):
+        self.recorder = VisitRecorder()
+        self.guest = User.objects.create(username='guest@mail.com', email='guest@mail.com')
+
+    def test_visits_of_deleted_guests_dropped(self):
+        deleted = User.objects.create(username='deleted@mail.com', email='deleted@mail.com')
+        self.recorder.record(self.guest.pk, '/home')
+        self.recorder.record(deleted.pk, '/home')
+        deleted.delete()
+        with self.assertLogs('backend.visits', 'WARNING'):
+            self.assertEqual(self.recorder.flush(), 1)
+        self.assertEqual(len(self.recorder), 0)
+        self.assertEqual(Visits.objects.get().guest, self.guest)
+
+    def test_failed_flush_backs_off(self):
+        self.recorder.record(self.guest.pk, '/first')
+        self.recorder.record(self.guest.pk, '/second')
+        with mock.patch.object(Visits.objects, 'bulk_create', side_effect=DatabaseError) as bulk_create, \
+                self.assertLogs('backend.visits', 'WARNING'):
+            self.assertEqual(self.recorder.flush(), 0)
+            with self.settings(VISITS_FLUSH_INTERVAL=0):
+                self.recorder.record(self.guest.pk, '/third')
+                self.recorder.record(self.guest.pk, '/fourth')
+            self.assertEqual(bulk_create.call_count, 1)
+        # The buffer keeps the newest visits
+        self.assertEqual([visit.page for visit in self.recorder._buffer], ['/second', '/third', '/fourth'])
+        self.assertEqual(self.recorder.flush(), 3)
+
+    def test_spooled_visits_of_deleted_guests_dropped(self):
+        deleted = User.objects.create(username='deleted@mail.com', email='deleted@mail.com')
+        self.recorder.record(self.guest.pk, '/home')
+        self.recorder.record(deleted.pk, '/home')
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir)
+        with self.settings(VISITS_SPOOL_DIR=spool_dir):
+            spool(self.recorder._drain())
+            deleted.delete()
+            with self.assertLogs('backend.visits', 'WARNING'):
+                self.assertEqual(load_spooled_visits(), 1)
+            self.assertEqual(os.listdir(spool_dir), [])
+        self.assertEqual(Visits.objects.get().guest, self.guest)
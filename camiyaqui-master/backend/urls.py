@@ -4,7 +4,7 @@ from django.urls import path
 from backend.views import GuestList, MessageList, MessageDetail, BackendLogin, ProfileDetails, ProfileEdit, \
     MessagesFromGuestList, \
     MessageCreate, MessageSend, GuestApprove, MessagePreview, MessageUpdate, UploadContactsView, MessageSendTest, \
-    GuestDetails, ExportGuests, ListNewsView, CreateNewsView
+    GuestDetails, ExportGuests, ListNewsView, CreateNewsView, EmailJobProgress
 
 urlpatterns = [
     path('', BackendLogin.as_view(), name='backend-login'),
@@ -17,6 +17,7 @@ urlpatterns = [
     path('message-list', staff_member_required(MessageList.as_view()), name='message-list'),
     path('message/<int:pk>', staff_member_required(MessageDetail.as_view()), name='message-detail'),
     path('message/send/<int:pk>', staff_member_required(MessageSend.as_view()), name='message-send'),
+    path('message/job/<int:pk>', staff_member_required(EmailJobProgress.as_view()), name='email-job-progress'),
     path('message/send/test/<int:pk>', staff_member_required(MessageSendTest.as_view()), name='send-to'),
     path('message/preview/<int:pk>', staff_member_required(MessagePreview.as_view()), name='message-preview'),
     path('message/edit/<int:pk>', staff_member_required(MessageUpdate.as_view()), name='message-edit'),
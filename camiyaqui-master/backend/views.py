@@ -1,24 +1,25 @@
-import csv
 import io
-import json
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView
-from django.core.serializers.json import DjangoJSONEncoder
-from django.http import HttpResponse
+from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404, redirect
-from django.template import Context, Template
+from django.template import Context
 from django.urls import reverse, reverse_lazy
 from django.views.generic import ListView, DetailView, UpdateView, CreateView
 from django.views.generic.base import View
 
+from backend.export import export_guests, export_filename, FORMATS
+from backend.importer import import_contacts
 from backend.forms import GuestForm, UploadFileForm, EmailGuest, GuestEdit
 from ourwedding.forms import GuestEditForm
 from ourwedding.models import MessageFromGuest, Guest
-from backend.models import Message, News
+from backend.models import Message, News, EmailJob
 from ourwedding.models import Profile
+from ourwedding.rsvp import get_summary
 from ourwedding.tokens import login_token_generator
 
 
@@ -30,24 +31,24 @@ class BackendLogin(LoginView):
 
 class GuestList(LoginRequiredMixin, View):
     template_name = 'backend/guest_list.html'
+    paginate_by = 100
 
     def get(self, request):
-        guests_waiting = Guest.objects.exclude(is_child=True).all()
-        children = Guest.objects.filter(is_child=True).all()
-        guests_approved = User.objects.all()
-        coming_guests = Profile.objects.filter(is_attending=True).count()
-        coming_guests += Guest.objects.filter(is_attending=True).exclude(is_child=True).count()
-        unsure_guests = Profile.objects.filter(is_attending=None).count()
-        not_coming_guests = Profile.objects.filter(is_attending=False).count()
-        need_van = Profile.objects.filter(needs_van=True).count() + Guest.objects.filter(needs_van=True).count()
+        guests_waiting = Guest.objects.exclude(is_child=True).select_related('invited_by')
+        children = Guest.objects.filter(is_child=True).select_related('invited_by')
+        guests_approved = User.objects.select_related('profile', 'profile__invited_by').order_by(
+            'last_name', 'first_name', 'pk')
+        page = Paginator(guests_approved, self.paginate_by).get_page(request.GET.get('page'))
+
+        rsvp = get_summary()
 
         return render(request, self.template_name, {
             'guests_waiting': guests_waiting,
-            'guests_approved': guests_approved,
-            'coming_guests': coming_guests,
-            'unsure_guests': unsure_guests,
-            'not_coming_guests': not_coming_guests,
-            'need_van': need_van,
+            'guests_approved': page,
+            'coming_guests': rsvp.coming,
+            'unsure_guests': rsvp.unsure,
+            'not_coming_guests': rsvp.not_coming,
+            'need_van': rsvp.need_van,
             'children': children
         })
 
@@ -109,12 +110,24 @@ class MessageList(LoginRequiredMixin, ListView):
     context_object_name = 'messages'
 
 
+BOOLEAN_VALUES = {'': False, '0': False, 'false': False, 'no': False, '1': True, 'true': True, 'yes': True}
+
+
 class ExportGuests(LoginRequiredMixin, View):
-    def get(self, *args):
-        response = HttpResponse(content_type='text/json')
-        response['Content-Disposition'] = 'attachment; filename="guests.json"'
-        data = list(User.objects.values())
-        response.write(json.dumps(data, cls=DjangoJSONEncoder))
+    """ Streams all the guests with their profiles. Accepts ``?format=json|jsonl|csv`` and ``?gzip=1|0``. """
+    def get(self, request, *args):
+        export_format = request.GET.get('format', 'json')
+        if export_format not in FORMATS:
+            return HttpResponseBadRequest('Unknown format, use one of {}'.format(', '.join(FORMATS)),
+                                          content_type='text/plain')
+        compress = request.GET.get('gzip', '').lower()
+        if compress not in BOOLEAN_VALUES:
+            return HttpResponseBadRequest('Unknown gzip value, use 1 or 0', content_type='text/plain')
+        compress = BOOLEAN_VALUES[compress]
+
+        content_type = 'application/gzip' if compress else FORMATS[export_format][0]
+        response = StreamingHttpResponse(export_guests(export_format, compress), content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(export_filename(export_format, compress))
         return response
 
 
@@ -128,13 +141,23 @@ class MessageSend(LoginRequiredMixin, View):
     def get(self, request, **kwargs):
         message = get_object_or_404(Message, pk=kwargs['pk'])
         form = EmailGuest()
-        return render(request, template_name=self.template_name, context={'message': message, 'form': form})
+        pending = message.send_all(dry_run=True)
+        return render(request, template_name=self.template_name,
+                      context={'message': message, 'form': form, 'pending': pending})
 
     def post(self, request, **kwargs):
-        message = Message.objects.get(pk=kwargs['pk'])
-        num_sent = message.send_all()
+        message = get_object_or_404(Message, pk=kwargs['pk'])
+        job = EmailJob.objects.create(message=message)
         form = EmailGuest()
-        return render(request, template_name=self.template_name, context={'message': message, 'form': form})
+        return render(request, template_name=self.template_name,
+                      context={'message': message, 'form': form, 'job': job})
+
+
+class EmailJobProgress(LoginRequiredMixin, View):
+    """ Progress of sending a message to all the guests, polled from the message dashboard. """
+    def get(self, request, **kwargs):
+        job = get_object_or_404(EmailJob, pk=kwargs['pk'])
+        return JsonResponse(job.progress())
 
 
 class MessageSendTest(LoginRequiredMixin, View):
@@ -166,8 +189,8 @@ class MessagePreview(LoginRequiredMixin, View):
         context.update({'guest': guest})
         context.update({'token': login_token_generator.make_token(guest)})
         context = Context(context)
-        tmpl_html = Template(message.template_html)
-        template = tmpl_html.render(context=context)
+        tmpl_txt, tmpl_html = message.compiled_templates()
+        template = (tmpl_html or tmpl_txt).render(context=context)
         return HttpResponse(template)
 
 
@@ -198,27 +221,12 @@ class UploadContactsView(LoginRequiredMixin, View):
 
     def post(self, request):
         form = UploadFileForm(request.POST, request.FILES)
+        report = None
         if form.is_valid():
-            csv_file = io.TextIOWrapper(request.FILES['file'].file)
-            csv_reader = csv.DictReader(csv_file)
-            line_count = 0
-            for row in csv_reader:
-                if line_count == 0:
-                    pass
-                if not User.objects.filter(email=row['email']).exists():
-                    new_user = User.objects.create(
-                        username=row['email'],
-                        email=row['email'],
-                        first_name=row['first_name'],
-                        last_name=row['last_name']
-                    )
-                    new_user.profile.language = row['language']
-                    new_user.save()
-                else:
-                    print(f'User {row["first_name"]} {row["last_name"]} already in DB')
-                line_count += 1
+            csv_file = io.TextIOWrapper(request.FILES['file'].file, encoding='utf-8')
+            report = import_contacts(csv_file)
 
-        return render(request, 'backend/upload_file.html', {'form': form})
+        return render(request, 'backend/upload_file.html', {'form': form, 'report': report})
 
 
 class ListNewsView(LoginRequiredMixin, ListView):
@@ -0,0 +1,132 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from .models import Visits
+
+logger = logging.getLogger(__name__)
+
+
+def of_existing_guests(visits):
+    """ Leaves out the visits of guests deleted since they were recorded, their rows would fail the whole INSERT.
+    """
+    guests = set(User.objects.filter(pk__in={visit.guest_id for visit in visits}).values_list('pk', flat=True))
+    existing = [visit for visit in visits if visit.guest_id in guests]
+    if len(existing) < len(visits):
+        logger.warning('Dropping {} visits of deleted guests'.format(len(visits) - len(existing)))
+    return existing
+
+
+class VisitRecorder:
+    """ Keeps page visits in memory and writes them with a single bulk INSERT, so guest requests don't pay for
+    analytics. The buffer is flushed once it holds VISITS_BATCH_SIZE visits, on the first visit recorded after
+    VISITS_FLUSH_INTERVAL seconds and, in the web server process, when it exits (see camiyaqui.wsgi). It never
+    holds more than VISITS_BUFFER_MAX visits; if the database is unavailable the oldest ones are dropped and
+    flushing is retried after VISITS_RETRY_INTERVAL seconds.
+    """
+    def __init__(self):
+        self._buffer = deque(maxlen=settings.VISITS_BUFFER_MAX)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._retry_after = 0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def record(self, guest_id, page):
+        self._buffer.append(Visits(guest_id=guest_id, page=page[:255], timestamps=now()))
+        current = time.monotonic()
+        if current < self._retry_after:
+            return
+        if len(self._buffer) >= settings.VISITS_BATCH_SIZE or \
+                current - self._last_flush >= settings.VISITS_FLUSH_INTERVAL:
+            self.flush()
+
+    def _drain(self):
+        with self._lock:
+            visits = list(self._buffer)
+            self._buffer.clear()
+            self._last_flush = time.monotonic()
+        return visits
+
+    def _requeue(self, visits):
+        """ Puts back visits that couldn't be stored, before the ones recorded meanwhile. If the buffer
+        overflows the oldest visits are dropped.
+        """
+        with self._lock:
+            recorded = list(self._buffer)
+            self._buffer.clear()
+            self._buffer.extend(visits)
+            self._buffer.extend(recorded)
+            dropped = len(visits) + len(recorded) - len(self._buffer)
+            self._retry_after = time.monotonic() + settings.VISITS_RETRY_INTERVAL
+        if dropped:
+            logger.warning('Dropping the {} oldest visits, the buffer is full'.format(dropped))
+
+    def flush(self):
+        """ Writes all the buffered visits. Returns the number of visits written. """
+        visits = self._drain()
+        if not visits:
+            return 0
+        try:
+            stored = of_existing_guests(visits)
+            Visits.objects.bulk_create(stored, batch_size=settings.VISITS_BATCH_SIZE)
+        except DatabaseError:
+            logger.exception('Could not store {} visits, retrying in {} seconds'.format(
+                len(visits), settings.VISITS_RETRY_INTERVAL))
+            self._requeue(visits)
+            return 0
+        self._retry_after = 0
+        return len(stored)
+
+    def shutdown(self):
+        """ Flushes the buffer before the web server process exits. Visits that can't be written are spooled to
+        VISITS_SPOOL_DIR (if set) to be loaded later with the ``flush_visits`` command.
+        """
+        if not self.flush() and len(self):
+            spool(self._drain())
+
+
+def spool(visits):
+    if not settings.VISITS_SPOOL_DIR:
+        logger.warning('Dropping {} visits, VISITS_SPOOL_DIR is not set'.format(len(visits)))
+        return
+    os.makedirs(settings.VISITS_SPOOL_DIR, exist_ok=True)
+    filename = os.path.join(settings.VISITS_SPOOL_DIR, 'visits-{}-{}.jsonl'.format(os.getpid(), uuid.uuid4().hex))
+    with open(filename, 'w', encoding='utf-8') as f:
+        for visit in visits:
+            f.write(json.dumps({'guest': visit.guest_id, 'page': visit.page,
+                                'timestamp': visit.timestamps.isoformat()}) + '\n')
+
+
+def load_spooled_visits():
+    """ Stores the visits spooled by processes that couldn't reach the database when exiting.
+    Returns the number of visits loaded.
+    """
+    if not settings.VISITS_SPOOL_DIR:
+        return 0
+    total = 0
+    for filename in sorted(glob.glob(os.path.join(settings.VISITS_SPOOL_DIR, 'visits-*.jsonl'))):
+        with open(filename, 'r', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        visits = [Visits(guest_id=row['guest'], page=row['page'], timestamps=parse_datetime(row['timestamp']))
+                  for row in rows]
+        visits = of_existing_guests(visits)
+        Visits.objects.bulk_create(visits, batch_size=settings.VISITS_BATCH_SIZE)
+        os.remove(filename)
+        total += len(visits)
+    return total
+
+
+visit_recorder = VisitRecorder()
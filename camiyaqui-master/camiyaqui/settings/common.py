@@ -22,7 +22,8 @@ INSTALLED_APPS = [
     'translated_fields',
     'rest_framework',
     'rest_framework.authtoken',
-    'photos'
+    'photos.apps.PhotosConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
@@ -32,6 +33,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ourwedding.middleware.GuestMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'backend.middleware.PageViewMiddleware',
@@ -105,6 +107,39 @@ LANGUAGES = (
 )
 
 LOGIN_TOKEN_TIMEOUT_DAYS = 180
+GUEST_LAST_LOGIN_GRANULARITY = 300  # seconds between updates of Profile.last_login
+RSVP_RECONCILE_INTERVAL = 600  # seconds before the RSVP counters are recomputed from scratch when read
+
+# The gallery index, the news feeds and the API tokens are cached, and cleared by the process that changes them.
+# CACHES is left to the deployment: with several processes set it to a memcached or redis server shared by all
+# of them (django.core.cache.backends.memcached.PyMemcacheCache or django.core.cache.backends.redis.RedisCache),
+# with the default LocMemCache the other processes only see a change once their entries time out.
+
+# Page visits are buffered in memory and stored in batches, see backend.visits
+VISITS_BATCH_SIZE = 50
+VISITS_FLUSH_INTERVAL = 10  # seconds
+VISITS_BUFFER_MAX = 5000
+VISITS_RETRY_INTERVAL = 60  # seconds without flushing after the database failed to store the visits
+VISITS_SPOOL_DIR = None  # Directory for visits that could not be stored on shutdown
+
+# E-mails are queued in backend.models.OutgoingEmail and delivered by the send_outbox command
+EMAIL_OUTBOX_MAX_ATTEMPTS = 3
+EMAIL_OUTBOX_RETRY_DELAY = 60  # seconds before a failed e-mail is retried, doubled after every attempt
+GUEST_MESSAGE_DIGEST_INTERVAL = None  # seconds, set to notify messages from guests in a single e-mail
+NEWS_FEED_TIMEOUT = 300  # seconds a news feed is cached, it's cleared when news are saved, see api.news
+# The cache of the API tokens and their users for GET requests, see api.authentication. A process-local or memcached
+# cache, a database cache would cost the query it saves.
+API_TOKEN_CACHE = 'default'
+API_TOKEN_CACHE_TIMEOUT = 300  # seconds
+
+PHOTOS_GALLERY_INDEX_TIMEOUT = 600  # seconds the list of galleries is cached, it's cleared when photos change
+PHOTOS_PAGE_SIZE = 60  # photos per page of a gallery
+PHOTOS_UPLOAD_BATCH_MAX = 100  # files per request to the batch upload policy endpoints
+AWS_S3_MAX_POOL_CONNECTIONS = 10  # HTTP connections kept by the S3 client shared by the process
+
+# Serve renditions generated by the render_photos command instead of resizing with RESIZE_API_ENDPOINT
+PHOTOS_LOCAL_RENDITIONS = False
+PHOTOS_RENDITION_STORAGE = None  # storage class of the originals and renditions, the default storage if None
 
 LOCALE_PATHS = [
     os.path.join(BASE_DIR, 'locale'),
@@ -121,7 +156,7 @@ MESSAGE_TAGS = {
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
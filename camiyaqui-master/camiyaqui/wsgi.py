@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/2.1/howto/deployment/wsgi/
 """
 
+import atexit
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'camiyaqui.settings.development')
 
 application = get_wsgi_application()
+
+# Only the web server buffers page visits, other processes (commands, tests) must not flush on exit
+from backend.visits import visit_recorder  # noqa: E402
+atexit.register(visit_recorder.shutdown)
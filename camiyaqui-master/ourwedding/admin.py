@@ -1,5 +1,16 @@
 from django.contrib import admin
 
-from .models import Profile, Group, Anecdote, MessageFromGuest, Guest
+from .models import Profile, Group, Anecdote, MessageFromGuest, Guest, send_codes
 
-admin.site.register((Profile, Group, Anecdote, MessageFromGuest, Guest))
\ No newline at end of file
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    actions = ['send_access_codes']
+
+    def send_access_codes(self, request, queryset):
+        queued = send_codes(queryset)
+        self.message_user(request, '{} access codes queued'.format(queued))
+    send_access_codes.short_description = 'Send the access code to the selected guests'
+
+
+admin.site.register((Group, Anecdote, MessageFromGuest, Guest))
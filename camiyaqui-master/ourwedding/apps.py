@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class OurweddingConfig(AppConfig):
     name = 'ourwedding'
+
+    def ready(self):
+        # Connects the RSVP counters to the Profile and Guest signals
+        import ourwedding.rsvp  # noqa
@@ -1,31 +1,35 @@
 from django import forms
-from django.contrib.auth.models import User
-from django.utils.http import base36_to_int
 from django.utils.translation import ugettext_lazy as _
 from ourwedding.models import MessageFromGuest, Guest
 from ourwedding.models import Profile
-from ourwedding.tokens import login_token_generator
+from ourwedding.tokens import login_token_generator, InvalidToken, ExpiredToken
 
 
 class SecretCodeForm(forms.Form):
     access_code = forms.CharField(required=True, max_length=255)
     next = forms.CharField(required=False, max_length=255)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user_cache = None
+
     def clean_access_code(self):
         access_code = self.cleaned_data.get('access_code', '').lower()
         if len(access_code.split('-')) != 3:
             raise forms.ValidationError(_('Wrong access code format'))
 
-        a, b, user_pk = self.cleaned_data['access_code'].split('-')
-        user_pk = base36_to_int(user_pk)
         try:
-            user = User.objects.get(pk=user_pk)
-        except User.DoesNotExist:
-            raise forms.ValidationError(_('Secret Code not Valid'))
-        if not login_token_generator.check_token(user, self.cleaned_data.get('access_code')):
+            self.user_cache = login_token_generator.verify_token(self.cleaned_data['access_code'])
+        except ExpiredToken:
             raise forms.ValidationError(_('Access Code Expired. Require a New one.'))
+        except InvalidToken:
+            raise forms.ValidationError(_('Secret Code not Valid'))
+
+        return self.user_cache.pk
 
-        return user_pk
+    def get_user(self):
+        """ The guest of the access code, with the profile, once the form is valid. """
+        return self.user_cache
 
 
 class RequestCodeForm(forms.Form):
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from ourwedding.rsvp import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recomputes the RSVP counters from scratch and reports how much they had drifted. The backend also " \
+           "recomputes them when they are older than RSVP_RECONCILE_INTERVAL"
+
+    def handle(self, *args, **options):
+        drift = reconcile()
+        if any(drift.values()):
+            self.stdout.write('Fixed drift: ' + ', '.join(
+                '{} {:+d}'.format(counter, value) for counter, value in drift.items() if value))
+        else:
+            self.stdout.write('RSVP counters are up to date')
@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
+
+
+def get_guest(request):
+    """ Returns the User of the guest logged in with an access code, or None. Profile and group are joined in the
+    same query and the result is cached on the request, so it is resolved at most once.
+    """
+    if not hasattr(request, '_cached_guest'):
+        guest = None
+        if request.session.get('guest'):
+            try:
+                guest = User.objects.select_related('profile', 'profile__group').get(pk=request.session['guest'])
+            except User.DoesNotExist:
+                pass
+        request._cached_guest = guest
+    return request._cached_guest
+
+
+class GuestMiddleware:
+    """ Adds ``request.guest``, the guest logged in through the session, resolved lazily on first access.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.guest = SimpleLazyObject(lambda: get_guest(request))
+        return self.get_response(request)
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ourwedding', '0007_auto_20190926_2057'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RsvpSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coming', models.IntegerField(default=0)),
+                ('unsure', models.IntegerField(default=0)),
+                ('not_coming', models.IntegerField(default=0)),
+                ('need_van', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
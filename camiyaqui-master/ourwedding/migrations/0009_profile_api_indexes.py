@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ourwedding', '0008_rsvpsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['language', 'is_attending'], name='ourwedding__languag_0adf7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['is_attending'], name='ourwedding__is_atte_2f9a8d_idx'),
+        ),
+    ]
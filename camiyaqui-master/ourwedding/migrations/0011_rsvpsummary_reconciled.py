@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ourwedding', '0010_profile_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rsvpsummary',
+            name='reconciled',
+            field=models.DateTimeField(default=None, null=True),
+        ),
+    ]
@@ -1,9 +1,14 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.mixins import AccessMixin
-from django.contrib.auth.models import User
+from django.db.models import Q
 from django.urls import reverse_lazy
 from django.utils.timezone import now
 from django.utils.translation import gettext as _
 
+from ourwedding.models import Profile
+
 
 class GuestMixin(AccessMixin):
     login_url = reverse_lazy('guest-login')
@@ -13,8 +18,20 @@ class GuestMixin(AccessMixin):
     def dispatch(self, request, *args, **kwargs):
         if not request.session.get('guest'):
             return self.handle_no_permission()
-        user = User.objects.get(pk=request.session.get('guest'))
-        user.profile.last_login = now()
-        user.save()
+        self.update_last_login(request)
         return super().dispatch(request, *args, **kwargs)
 
+    def update_last_login(self, request):
+        """ Keeps track of when the guest was last seen. The profile is only updated when the stored value is
+        older than GUEST_LAST_LOGIN_GRANULARITY seconds, and the time of the last update is kept in the session,
+        so most requests don't touch the database.
+        """
+        current = now()
+        granularity = timedelta(seconds=settings.GUEST_LAST_LOGIN_GRANULARITY)
+        last_seen = request.session.get('guest_last_seen')
+        if last_seen and current.timestamp() - last_seen < granularity.total_seconds():
+            return
+        Profile.objects.filter(user_id=request.session.get('guest')).filter(
+            Q(last_login__isnull=True) | Q(last_login__lt=current - granularity)
+        ).update(last_login=current)
+        request.session['guest_last_seen'] = current.timestamp()
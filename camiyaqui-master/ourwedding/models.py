@@ -1,4 +1,3 @@
-import os
 import uuid
 
 from django.contrib.auth.models import User
@@ -7,13 +6,15 @@ from django.dispatch import receiver
 from django.utils.timezone import now
 from django.utils.translation import gettext as _
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives, EmailMessage
-from django.db import models
-from django.template import Template, Context
+from django.core.mail import EmailMultiAlternatives
+from django.db import models, transaction
+from django.template.loader import select_template
 from rest_framework.authtoken.models import Token
 
 from .tokens import login_token_generator
 
+_access_code_templates = {}
+
 
 class Group(models.Model):
     """ A group of guests coming together. It can be a Family, a couple, etc.
@@ -49,7 +50,7 @@ class Profile(models.Model):
     comes_from = models.TextField(_('Coming from'), blank=True, null=True, default=None)
     pre_wedding = models.BooleanField(_('pre wedding'), default=False, help_text=_('Are you attending the pre-wedding?'))
     post_wedding = models.BooleanField(_('post wedding'), default=False, help_text=_('Are you attending the post-wedding?'))
-
+    updated_at = models.DateTimeField(auto_now=True)  # also changes when the user is saved, see save_user_profile
 
     @property
     def access_code(self):
@@ -67,25 +68,21 @@ class Profile(models.Model):
     def email(self):
         return self.user.email
 
-    def send_code(self):
-        """Sends the access code by e-mail.
+    def access_code_email(self):
+        """Builds the e-mail with the access code, in the language of the guest.
         """
         token = login_token_generator.make_token(self.user)
+        context = {'guest': self, 'token': token, 'domain': settings.WEBSITE_URL}
+        msg_txt = access_code_template(self.language).render(context)
+        return EmailMultiAlternatives('Access Code', msg_txt, settings.EMAIL_FROM, [self.user.email],
+                                      reply_to=[settings.EMAIL_FROM])
 
-        # Default to english
-        template_email = os.path.join(settings.BASE_DIR, 'templates', 'emails', 'access_token_en.txt')
-        if self.language == 'es':
-            template_email = os.path.join(settings.BASE_DIR, 'templates', 'emails', 'access_token_es.txt')
-
-        with open(template_email, 'r', encoding='utf-8') as f:
-            file = f.read()
+    def send_code(self):
+        """Queues the access code e-mail in the outbox.
+        """
+        from backend.outbox import queue_email
 
-        tmpl_txt = Template(file)
-        context = Context({'guest': self, 'token': token, 'domain': settings.WEBSITE_URL})
-        msg_txt = tmpl_txt.render(context=context)
-        msg = EmailMultiAlternatives('Access Code', msg_txt, settings.EMAIL_FROM, [self.user.email],
-                                     reply_to=[settings.EMAIL_FROM])
-        msg.send()
+        queue_email(self.access_code_email())
 
     def __str__(self):
         if self.nickname:
@@ -96,6 +93,32 @@ class Profile(models.Model):
 
     class Meta:
         ordering = ['-is_attending']
+        indexes = [
+            # Filters of the guest API, see api.views.GuestViewSet
+            models.Index(fields=['language', 'is_attending']),
+            models.Index(fields=['is_attending']),
+        ]
+
+
+def access_code_template(language):
+    """ The template of the access code e-mail for a language, defaulting to English. Each template is loaded
+    and compiled once.
+    """
+    if language not in _access_code_templates:
+        _access_code_templates[language] = select_template(
+            ['emails/access_token_{}.txt'.format(language), 'emails/access_token_en.txt'])
+    return _access_code_templates[language]
+
+
+def send_codes(profiles):
+    """ Queues the access code of many guests at once in the outbox, with a single INSERT.
+    Returns the number of e-mails queued.
+    """
+    from backend.outbox import queue_emails
+
+    if isinstance(profiles, models.QuerySet):
+        profiles = profiles.select_related('user')
+    return len(queue_emails([profile.access_code_email() for profile in profiles]))
 
 
 class Guest(models.Model):
@@ -136,25 +159,18 @@ class MessageFromGuest(models.Model):
         return "Message from {}".format(self.guest)
 
     def save(self, **kwargs):
-        super(MessageFromGuest, self).save(**kwargs)
-        if self.guest and not self.notified:
-            admins = User.objects.filter(is_staff=True).values('email')
-            to_email = []
-            for admin in admins:
-                to_email.append(admin['email'])
-
-            email = EmailMessage(
-                f'Nuevo mensaje de {self.guest}',
-                self.message,
-                settings.DEFAULT_EMAIL_FROM,
-                to_email,
-                [settings.DEFAULT_EMAIL_FROM],
-                reply_to=[self.guest.email],
-            )
-            email.send()
+        """ The staff is notified by e-mail once the message is committed, through the outbox. If
+        GUEST_MESSAGE_DIGEST_INTERVAL is set, messages are left for the digest sent by send_outbox instead.
+        """
+        notify = self.guest_id and not self.notified and not settings.GUEST_MESSAGE_DIGEST_INTERVAL
+        if notify:
             self.notified = True
             self.notified_on = now()
-            super(MessageFromGuest, self).save(**kwargs)
+        super(MessageFromGuest, self).save(**kwargs)
+        if notify:
+            from ourwedding.notifications import notify_admins
+
+            transaction.on_commit(lambda: notify_admins([self.pk]))
 
 
 class Anecdote(models.Model):
@@ -175,6 +191,21 @@ class Anecdote(models.Model):
         return "Message from {}".format(self.guest)
 
 
+class RsvpSummary(models.Model):
+    """ Running totals of the RSVPs shown in the backend. They are updated on every change of a Profile or a
+    Guest (see ourwedding.rsvp) and recomputed from scratch when they are read after RSVP_RECONCILE_INTERVAL
+    seconds, or by the reconcile_rsvp command.
+    """
+    coming = models.IntegerField(default=0)
+    unsure = models.IntegerField(default=0)
+    not_coming = models.IntegerField(default=0)
+    need_van = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+    reconciled = models.DateTimeField(default=None, null=True)
+
+    def __str__(self):
+        return "RSVP: {} coming, {} unsure, {} not coming".format(self.coming, self.unsure, self.not_coming)
+
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
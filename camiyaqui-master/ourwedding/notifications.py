@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage
+from django.utils.timezone import now
+
+from backend.outbox import queue_email
+from ourwedding.models import MessageFromGuest
+
+
+def notify_admins(message_ids):
+    """ Queues one e-mail to the staff with the given messages from guests. """
+    messages = list(MessageFromGuest.objects.filter(id__in=message_ids).select_related('guest').order_by('timestamp'))
+    if not messages:
+        return
+    to_email = list(User.objects.filter(is_staff=True).values_list('email', flat=True))
+
+    if len(messages) == 1:
+        message = messages[0]
+        subject = f'Nuevo mensaje de {message.guest}'
+        body = message.message
+        reply_to = [message.guest.email]
+    else:
+        subject = f'{len(messages)} nuevos mensajes'
+        body = '\n\n'.join(f'{message.guest} <{message.guest.email}> ({message.timestamp:%Y-%m-%d %H:%M}):\n'
+                           f'{message.message}' for message in messages)
+        reply_to = None
+
+    email = EmailMessage(
+        subject,
+        body,
+        settings.DEFAULT_EMAIL_FROM,
+        to_email,
+        [settings.DEFAULT_EMAIL_FROM],
+        reply_to=reply_to,
+    )
+    queue_email(email)
+
+
+def send_digest():
+    """ When GUEST_MESSAGE_DIGEST_INTERVAL is set, messages from guests are not notified one by one. Once the
+    oldest pending message waited that many seconds, all the pending ones are sent to the staff in a single
+    e-mail. Returns the number of messages notified.
+    """
+    if not settings.GUEST_MESSAGE_DIGEST_INTERVAL:
+        return 0
+    pending = MessageFromGuest.objects.filter(notified=False, guest__isnull=False)
+    oldest = pending.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is None or now() - oldest < timedelta(seconds=settings.GUEST_MESSAGE_DIGEST_INTERVAL):
+        return 0
+    message_ids = list(pending.values_list('id', flat=True))
+    notify_admins(message_ids)
+    return MessageFromGuest.objects.filter(id__in=message_ids).update(notified=True, notified_on=now())
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, F
+from django.db.models.signals import post_init, post_save, post_delete
+from django.utils.timezone import now
+
+from ourwedding.models import Profile, Guest, RsvpSummary
+
+COUNTERS = ('coming', 'unsure', 'not_coming', 'need_van')
+TRACKED_FIELDS = ('is_attending', 'is_child', 'needs_van')
+
+
+def contribution(instance):
+    """ What a Profile or a Guest adds to each of the RSVP counters. Children invited by other guests are
+    not counted as coming, and only the guests with a profile are counted as unsure or not coming.
+    """
+    if isinstance(instance, Profile):
+        return {
+            'coming': int(instance.is_attending is True),
+            'unsure': int(instance.is_attending is None),
+            'not_coming': int(instance.is_attending is False),
+            'need_van': int(bool(instance.needs_van)),
+        }
+    return {
+        'coming': int(instance.is_attending is True and not instance.is_child),
+        'unsure': 0,
+        'not_coming': 0,
+        'need_van': int(bool(instance.needs_van)),
+    }
+
+
+def count_rsvps():
+    """ Counts the RSVPs from scratch, with one query per table. """
+    profiles = Profile.objects.aggregate(
+        coming=Count('id', filter=Q(is_attending=True)),
+        unsure=Count('id', filter=Q(is_attending=None)),
+        not_coming=Count('id', filter=Q(is_attending=False)),
+        need_van=Count('id', filter=Q(needs_van=True)),
+    )
+    guests = Guest.objects.aggregate(
+        coming=Count('id', filter=Q(is_attending=True, is_child=False)),
+        need_van=Count('id', filter=Q(needs_van=True)),
+    )
+    return {
+        'coming': profiles['coming'] + guests['coming'],
+        'unsure': profiles['unsure'],
+        'not_coming': profiles['not_coming'],
+        'need_van': profiles['need_van'] + guests['need_van'],
+    }
+
+
+def get_summary():
+    """ The RSVP counters are updated from the signals of every Profile and Guest saved, but they drift with
+    concurrent edits and with the changes that don't send signals, like QuerySet.update(). They are recomputed
+    when read if they weren't reconciled in the last RSVP_RECONCILE_INTERVAL seconds.
+    """
+    try:
+        summary = RsvpSummary.objects.get(pk=1)
+    except RsvpSummary.DoesNotExist:
+        summary, created = RsvpSummary.objects.get_or_create(pk=1, defaults=dict(count_rsvps(), reconciled=now()))
+    if summary.reconciled is None or \
+            now() - summary.reconciled > timedelta(seconds=settings.RSVP_RECONCILE_INTERVAL):
+        reconcile(summary)
+    return summary
+
+
+def apply_delta(delta):
+    delta = {counter: value for counter, value in delta.items() if value}
+    if delta:
+        RsvpSummary.objects.filter(pk=1).update(**{counter: F(counter) + value for counter, value in delta.items()})
+
+
+def reconcile(summary=None):
+    """ Recomputes the summary from scratch. Returns the drift of each counter, stored minus actual. """
+    counts = count_rsvps()
+    if summary is None:
+        summary, created = RsvpSummary.objects.get_or_create(pk=1, defaults=counts)
+    drift = {counter: getattr(summary, counter) - counts[counter] for counter in COUNTERS}
+    summary.reconciled = now()
+    RsvpSummary.objects.filter(pk=1).update(reconciled=summary.reconciled, **counts)
+    for counter, value in counts.items():
+        setattr(summary, counter, value)
+    return drift
+
+
+def remember_rsvp(sender, instance, **kwargs):
+    if instance.get_deferred_fields().intersection(TRACKED_FIELDS):
+        instance._rsvp = None
+    else:
+        instance._rsvp = contribution(instance)
+
+
+def update_rsvp(sender, instance, created, **kwargs):
+    new = contribution(instance)
+    old = dict.fromkeys(COUNTERS, 0) if created else getattr(instance, '_rsvp', None)
+    if old is not None:
+        apply_delta({counter: new[counter] - old[counter] for counter in COUNTERS})
+    instance._rsvp = new
+
+
+def remove_rsvp(sender, instance, **kwargs):
+    old = getattr(instance, '_rsvp', None)
+    if old is not None:
+        apply_delta({counter: -old[counter] for counter in COUNTERS})
+
+
+for model in (Profile, Guest):
+    post_init.connect(remember_rsvp, sender=model)
+    post_save.connect(update_rsvp, sender=model)
+    post_delete.connect(remove_rsvp, sender=model)
@@ -0,0 +1,97 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.template.loader import select_template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from backend.models import OutgoingEmail
+from backend.visits import VisitRecorder
+from ourwedding.models import Profile, access_code_template, send_codes
+from ourwedding.tokens import login_token_generator, InvalidToken, ExpiredToken
+
+
+@mock.patch('backend.middleware.visit_recorder', VisitRecorder())
+@override_settings(VISITS_FLUSH_INTERVAL=3600)
+class TestVerifyToken(TestCase):
+    def setUp(self):
+        self.guest = User.objects.create(first_name='Aquiles', last_name='Carattino', email='lala@lolo.com',
+                                         username='lala@lolo.com')
+        self.token = login_token_generator.make_token(self.guest)
+
+    def test_verify_token(self):
+        with self.assertNumQueries(1):
+            user = login_token_generator.verify_token(self.token)
+            self.assertEqual(user.profile.language, 'es')
+        self.assertEqual(user, self.guest)
+
+    def test_invalid_tokens(self):
+        other = User.objects.create(email='cami@lolo.com', username='cami@lolo.com')
+        forged = self.token.rsplit('-', 1)[0] + '-' + login_token_generator.make_token(other).rsplit('-', 1)[1]
+        for token in (None, '12345', 'abc-123-zzzzzzzzzzzzzzzzzz', 'abc-123-zz', forged):
+            with self.subTest(token=token), self.assertRaises(InvalidToken):
+                login_token_generator.verify_token(token)
+
+    def test_expired_token(self):
+        ts = login_token_generator._num_days(date(2019, 1, 1))
+        token = login_token_generator._make_token_with_timestamp(self.guest, ts)
+        with self.assertRaises(ExpiredToken):
+            login_token_generator.verify_token(token)
+
+    def test_check_token(self):
+        other = User.objects.create(email='cami@lolo.com', username='cami@lolo.com')
+        self.assertTrue(login_token_generator.check_token(self.guest, self.token))
+        self.assertFalse(login_token_generator.check_token(other, self.token))
+        self.assertFalse(login_token_generator.check_token(self.guest, None))
+        self.assertFalse(login_token_generator.check_token(None, self.token))
+
+    def test_guest_login_loads_user_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('guest-login'), data={'access_code': self.token})
+        self.assertEqual(response.status_code, 302)
+        user_selects = [query for query in queries if query['sql'].startswith('SELECT') and 'auth_user' in query['sql']]
+        self.assertEqual(len(user_selects), 1)
+        self.assertEqual(self.client.session['guest'], self.guest.pk)
+
+    def test_api_login(self):
+        response = self.client.post('/api/login', {'email': 'lala@lolo.com', 'access_code': self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('key', response.json())
+        response = self.client.post('/api/login', {'email': 'cami@lolo.com', 'access_code': self.token})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestAccessCodeEmails(TestCase):
+    def setUp(self):
+        for i, language in enumerate(('es', 'en', 'fr')):
+            user = User.objects.create(email='guest{}@mail.com'.format(i), username='guest{}@mail.com'.format(i))
+            user.profile.language = language
+            user.profile.save()
+
+    def test_send_codes_queued(self):
+        """ The profiles and their users are loaded in one query and the e-mails queued with one INSERT. """
+        with self.assertNumQueries(2):
+            self.assertEqual(send_codes(Profile.objects.all()), 3)
+        self.assertEqual(sorted(OutgoingEmail.objects.values_list('to', flat=True)),
+                         ['guest0@mail.com', 'guest1@mail.com', 'guest2@mail.com'])
+        self.assertEqual(set(OutgoingEmail.objects.values_list('status', flat=True)), {OutgoingEmail.QUEUED})
+
+    def test_access_code_in_email(self):
+        send_codes(Profile.objects.filter(user__email='guest0@mail.com'))
+        guest = User.objects.get(email='guest0@mail.com')
+        self.assertIn(login_token_generator.make_token(guest), OutgoingEmail.objects.get().body)
+
+    @mock.patch.dict('ourwedding.models._access_code_templates', clear=True)
+    def test_template_language_fallback(self):
+        self.assertEqual(access_code_template('es').template.name, 'emails/access_token_es.txt')
+        self.assertEqual(access_code_template('fr').template.name, 'emails/access_token_en.txt')
+
+    @mock.patch.dict('ourwedding.models._access_code_templates', clear=True)
+    def test_template_loaded_once(self):
+        with mock.patch('ourwedding.models.select_template', wraps=select_template) as select:
+            send_codes(Profile.objects.all())
+            send_codes(Profile.objects.all())
+        self.assertEqual(select.call_count, 3)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils.timezone import now
+
+from backend.models import OutgoingEmail
+from ourwedding.models import MessageFromGuest
+from ourwedding.notifications import send_digest
+
+
+class TestMessageNotification(TransactionTestCase):
+    def setUp(self):
+        User.objects.create(email='staff@mail.com', username='staff@mail.com', is_staff=True)
+        self.guest = User.objects.create(first_name='Aquiles', last_name='Carattino', email='lala@lolo.com',
+                                         username='lala@lolo.com')
+
+    @override_settings(GUEST_MESSAGE_DIGEST_INTERVAL=None)
+    def test_queued_after_commit(self):
+        with transaction.atomic():
+            message = MessageFromGuest.objects.create(guest=self.guest, message='Hello!')
+            self.assertFalse(OutgoingEmail.objects.exists())
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.to, email.body), ('staff@mail.com', 'Hello!'))
+        self.assertTrue(MessageFromGuest.objects.get(pk=message.pk).notified)
+
+    @override_settings(GUEST_MESSAGE_DIGEST_INTERVAL=None)
+    def test_not_queued_on_rollback(self):
+        try:
+            with transaction.atomic():
+                MessageFromGuest.objects.create(guest=self.guest, message='Hello!')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+
+@override_settings(GUEST_MESSAGE_DIGEST_INTERVAL=None)
+class TestMessageWrite(TestCase):
+    def test_written_once(self):
+        """ The message is stored already marked as notified, with a single INSERT. """
+        guest = User.objects.create(email='lala@lolo.com', username='lala@lolo.com')
+        with self.assertNumQueries(1):
+            message = MessageFromGuest.objects.create(guest=guest, message='Hello!')
+        self.assertTrue(message.notified)
+
+
+@override_settings(GUEST_MESSAGE_DIGEST_INTERVAL=600)
+class TestDigest(TestCase):
+    def setUp(self):
+        User.objects.create(email='staff@mail.com', username='staff@mail.com', is_staff=True)
+        for i in range(3):
+            guest = User.objects.create(email='guest{}@mail.com'.format(i), username='guest{}@mail.com'.format(i))
+            MessageFromGuest.objects.create(guest=guest, message='Message {}'.format(i))
+
+    def test_digest(self):
+        self.assertFalse(OutgoingEmail.objects.exists())
+        self.assertEqual(send_digest(), 0)
+
+        MessageFromGuest.objects.update(timestamp=now() - timedelta(seconds=601))
+        self.assertEqual(send_digest(), 3)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.subject, '3 nuevos mensajes')
+        for i in range(3):
+            self.assertIn('Message {}'.format(i), email.body)
+        self.assertFalse(MessageFromGuest.objects.filter(notified=False).exists())
+
+        self.assertEqual(send_digest(), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
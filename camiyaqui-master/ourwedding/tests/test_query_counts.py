@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from backend.visits import VisitRecorder
+from ourwedding.models import Group, Guest, Profile
+
+
+@mock.patch('backend.middleware.visit_recorder', VisitRecorder())
+@override_settings(VISITS_FLUSH_INTERVAL=3600)
+class TestGuestPageQueries(TestCase):
+    """ The guest is resolved once per request through ``request.guest``. These tests pin the number of queries
+    of every guest page so that new per-request lookups don't go unnoticed.
+    """
+    expected_queries = {
+        'home': 1,
+        'guest-login': 1,
+        'guest-register': 2,
+        'guest-profile': 2,
+        'save-the-date': 2,
+        'code-sent': 1,
+        'home-forbidden': 1,
+        'guest-list': 3,
+        'RSVP': 4,
+        'guest-add': 1,
+        'list-messages': 3,
+        'create-message': 1,
+        'contact': 1,
+        'update-guest-ajax': 1,
+        'event': 1,
+        'event-wedding': 1,
+        'event-pre-wedding': 1,
+        'buenosaires': 1,
+        'tango': 1,
+        'accommodation': 1,
+        'help': 1,
+    }
+
+    def setUp(self):
+        group = Group.objects.create(name='Carattino')
+        self.guest = User.objects.create(first_name='Aquiles', last_name='Carattino', email='lala@lolo.com',
+                                         username='lala@lolo.com')
+        self.guest.profile.group = group
+        self.guest.profile.save()
+        other = User.objects.create(first_name='Camila', last_name='Carattino', email='cami@lolo.com',
+                                    username='cami@lolo.com')
+        other.profile.group = group
+        other.profile.save()
+        Guest.objects.create(first_name='Invited', last_name='Guest', invited_by=self.guest)
+
+        session = self.client.session
+        session['guest'] = self.guest.pk
+        session['guest_last_seen'] = now().timestamp()
+        session.save()
+
+    def test_guest_pages(self):
+        for name, queries in self.expected_queries.items():
+            with self.subTest(url=name), self.assertNumQueries(queries):
+                self.client.get(reverse(name))
+
+    def test_guest_resolved_once(self):
+        """ Posting a message used to look the guest up in the mixin, the view and the middleware. Now the guest
+        is loaded once and the message is stored with a single INSERT, the admins are notified after commit.
+        """
+        with self.assertNumQueries(3):
+            self.client.post(reverse('contact'), data={'message': 'Hello!'})
+
+
+@mock.patch('backend.middleware.visit_recorder', VisitRecorder())
+@override_settings(GUEST_LAST_LOGIN_GRANULARITY=300)
+class TestLastLoginThrottle(TestCase):
+    def setUp(self):
+        self.guest = User.objects.create(email='lala@lolo.com', username='lala@lolo.com')
+        session = self.client.session
+        session['guest'] = self.guest.pk
+        session.save()
+
+    def profile_updates(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('event')).status_code, 200)
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE "ourwedding_profile"')]
+
+    def test_last_login_throttled(self):
+        self.assertEqual(len(self.profile_updates()), 1)
+        last_login = Profile.objects.get(user=self.guest).last_login
+        self.assertIsNotNone(last_login)
+        for _ in range(3):
+            self.assertEqual(self.profile_updates(), [])
+        self.assertEqual(Profile.objects.get(user=self.guest).last_login, last_login)
+
+        # Another session of the same guest doesn't change the stored time until it is older than the granularity
+        session = self.client.session
+        del session['guest_last_seen']
+        session.save()
+        self.profile_updates()
+        self.assertEqual(Profile.objects.get(user=self.guest).last_login, last_login)
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils.timezone import now
+
+from ourwedding.models import Guest, RsvpSummary
+from ourwedding.rsvp import get_summary, count_rsvps, reconcile, COUNTERS
+
+
+class TestRsvpSummary(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(first_name='Aquiles', last_name='Carattino', email='lala@lolo.com',
+                                        username='lala@lolo.com')
+        get_summary()
+
+    def assertSummaryUpToDate(self):
+        summary = RsvpSummary.objects.get()
+        counts = count_rsvps()
+        self.assertEqual({counter: getattr(summary, counter) for counter in COUNTERS}, counts)
+
+    def test_profile_changes(self):
+        self.assertEqual(get_summary().unsure, 1)
+        self.user.profile.is_attending = True
+        self.user.profile.needs_van = True
+        self.user.profile.save()
+        summary = get_summary()
+        self.assertEqual((summary.coming, summary.unsure, summary.need_van), (1, 0, 1))
+        self.user.delete()
+        self.assertSummaryUpToDate()
+
+    def test_guest_changes(self):
+        guest = Guest.objects.create(first_name='Camila', last_name='Carattino', is_attending=True)
+        child = Guest.objects.create(first_name='Child', last_name='Carattino', is_attending=True, is_child=True)
+        self.assertEqual(get_summary().coming, 1)
+        guest.is_attending = False
+        guest.save()
+        child.needs_van = True
+        child.save()
+        self.assertSummaryUpToDate()
+        Guest.objects.get(pk=child.pk).delete()
+        self.assertSummaryUpToDate()
+
+    def test_read_once(self):
+        """ Reading a reconciled summary doesn't count the RSVPs again. """
+        with self.assertNumQueries(1):
+            get_summary()
+
+    def test_unchanged_save_does_not_write(self):
+        profile = User.objects.get(pk=self.user.pk).profile
+        with self.assertNumQueries(1):
+            profile.save()
+
+    def test_reconcile(self):
+        RsvpSummary.objects.update(coming=5)
+        self.assertEqual(reconcile(), {'coming': 5, 'unsure': 0, 'not_coming': 0, 'need_van': 0})
+        self.assertSummaryUpToDate()
+        self.assertFalse(any(reconcile().values()))
+
+    def test_stale_summary_recomputed(self):
+        """ Changes made with QuerySet.update() don't reach the counters until they are reconciled. """
+        Guest.objects.create(first_name='Camila', last_name='Carattino')
+        Guest.objects.update(is_attending=True)
+        self.assertEqual(get_summary().coming, 0)
+        RsvpSummary.objects.update(reconciled=now() - timedelta(hours=1))
+        self.assertEqual(get_summary().coming, 1)
+        self.assertSummaryUpToDate()
@@ -1,35 +1,54 @@
 from datetime import date
 
 from django.conf import settings
+from django.contrib.auth.models import User
 from django.utils.crypto import salted_hmac, constant_time_compare
 from django.utils.http import int_to_base36, base36_to_int
 
 
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
 class LoginTokenGenerator:
     key_salt = 'LoginTokenGenerator'
     secret = settings.SECRET_KEY
 
-    def check_token(self, user, token):
-        if not (user and token):
-            return False
-
+    def verify_token(self, token):
+        """ Returns the user of a valid access code, with its profile. The code is parsed once and the user loaded
+        with a single query. Raises InvalidToken, or ExpiredToken if the code is older than LOGIN_TOKEN_TIMEOUT_DAYS.
+        """
         try:
             ts_b36, _, us_b36 = token.split('-')
-        except ValueError:
-            return False
+            ts, user_pk = base36_to_int(ts_b36), base36_to_int(us_b36)
+        except (AttributeError, ValueError):
+            raise InvalidToken(token)
 
         try:
-            ts = base36_to_int(ts_b36)
-        except ValueError:
-            return False
+            user = User.objects.select_related('profile').get(pk=user_pk)
+        except User.DoesNotExist:
+            raise InvalidToken(token)
 
         if not constant_time_compare(self._make_token_with_timestamp(user, ts), token):
-            return False
+            raise InvalidToken(token)
 
         if (self._num_days(date.today())-ts) > settings.LOGIN_TOKEN_TIMEOUT_DAYS:
-            return False
+            raise ExpiredToken(token)
+
+        return user
 
-        return True
+    def check_token(self, user, token):
+        """ Whether the access code is valid and belongs to the user, see verify_token. """
+        if not user:
+            return False
+        try:
+            return self.verify_token(token).pk == user.pk
+        except InvalidToken:
+            return False
 
     def make_token(self, user):
         return self._make_token_with_timestamp(user, self._num_days(date.today()))
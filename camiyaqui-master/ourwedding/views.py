@@ -34,7 +34,7 @@ class Register(View):
         form = self.form()
         if request.session.get('guest'):
             form = self.form(request.GET)
-            guest = User.objects.get(pk=request.session.get('guest'))
+            guest = request.guest
             error_msg = _('You are already logged in as {}. Are you sure you want to register again?')
             form.errors[NON_FIELD_ERRORS] = [error_msg.format(guest)]
             messages.warning(request, error_msg.format(guest))
@@ -64,7 +64,7 @@ class GuestLogin(View):
         """
         form = SecretCodeForm(request.GET)
         if form.is_valid():
-            user = User.objects.get(pk=form.cleaned_data.get('access_code'))
+            user = form.get_user()
             login(request, user)
             request.user = user
             request.session['guest'] = user.pk
@@ -106,8 +106,7 @@ class GuestProfile(GuestMixin, SuccessMessageMixin, UpdateView):
     success_message = _("Thanks for updating your profile.")
 
     def get_object(self, queryset=None):
-        user = User.objects.get(pk=self.request.session.get('guest'))
-        return user.profile
+        return self.request.guest.profile
 
 
 class Contact(GuestMixin, SuccessMessageMixin, CreateView):
@@ -119,8 +118,7 @@ class Contact(GuestMixin, SuccessMessageMixin, CreateView):
 
     def form_valid(self, form):
         obj = form.save(commit=False)
-        user = User.objects.get(pk=self.request.session.get('guest'))
-        obj.guest = user
+        obj.guest = self.request.guest
         obj.save()
         return redirect(self.success_url)
 
@@ -129,14 +127,16 @@ class GroupView(GuestMixin, View):
     template_name = 'ourwedding/group_detail.html'
 
     def get(self, request):
-        user = User.objects.get(pk=self.request.session.get('guest'))
+        user = request.guest
         if not user.profile.group:
             group = Group.objects.create(name=user)
             user.profile.group = group
-            user.save()
+            user.profile.save()
 
+        members = user.profile.group.members.select_related('user')
         guest_invites = Guest.objects.filter(invited_by=user)
-        return render(request, self.template_name, {'group': user.profile.group, 'invites': guest_invites})
+        return render(request, self.template_name, {'group': user.profile.group, 'members': members,
+                                                    'invites': guest_invites})
 
 
 class GuestEdit(GuestMixin, UpdateView):
@@ -149,7 +149,7 @@ class GuestEdit(GuestMixin, UpdateView):
     def dispatch(self, request, *args, **kwargs):
         """ Making sure that only authors can update stories """
         obj = self.get_object()
-        current_guest = Profile.objects.get(pk=self.request.session.get('guest'))
+        current_guest = request.guest.profile
         if obj.group != current_guest.group:
             messages.warning(request, _('You can\'t edit a guest from a different group'))
             return redirect(reverse_lazy('group'))
@@ -165,10 +165,8 @@ class GuestAdd(GuestMixin, View):
         form = GuestCreateForm(request.POST)
         if form.is_valid():
             new_guest = form.save(commit=False)
-            curr_guest = User.objects.get(pk=request.session.get('guest'))
-            new_guest.invited_by = curr_guest
+            new_guest.invited_by = request.guest
             new_guest.save()
-            curr_guest.save()
             return redirect(reverse_lazy('RSVP'))
         return render(request, 'ourwedding/add_guest.html', {'form': form})
 
@@ -180,7 +178,7 @@ class CreateMessage(GuestMixin, CreateView):
     fields = ('message',)
 
     def form_valid(self, form):
-        form.instance.guest = Profile.objects.get(pk=self.request.session.get('guest'))
+        form.instance.guest = self.request.guest.profile
         return super(CreateMessage, self).form_valid(form)
 
 
@@ -190,8 +188,7 @@ class ViewMessages(GuestMixin, ListView):
     context_object_name = 'messages'
 
     def get_queryset(self):
-        guest = Profile.objects.get(pk=self.request.session.get('guest'))
-        return Anecdote.objects.filter(guest=guest)
+        return Anecdote.objects.filter(guest=self.request.guest.profile)
 
 
 class UpdateGuestAjax(GuestMixin, View):
@@ -280,9 +277,7 @@ class SecretCodeValidationView(View):
 
 class SaveTheDateView(GuestMixin, TemplateView):
     def get_template_names(self):
-        guest_pk = self.request.session.get('guest')
-        guest = Profile.objects.get(pk=guest_pk)
-        if guest.language == 'en':
+        if self.request.guest.profile.language == 'en':
             return 'savethedate/index_en.html'
         return 'savethedate/index_es.html'
 
@@ -293,6 +288,7 @@ class HelpView(TemplateView):
 
 class GuestList(GuestMixin, ListView):
     model = User
+    queryset = User.objects.select_related('profile').prefetch_related('invites')
     template_name = 'ourwedding/guest_list.html'
     context_object_name = 'guests'
 
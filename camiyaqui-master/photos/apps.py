@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PhotosConfig(AppConfig):
     name = 'photos'
+
+    def ready(self):
+        # Clears the cached gallery index when photos or guests change
+        import photos.gallery_index  # noqa
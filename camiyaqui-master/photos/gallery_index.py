@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import FileItem
+
+CACHE_KEY = 'photos:gallery-index'
+
+
+def build_gallery_index():
+    """ The galleries of the guests who uploaded photos, with their number of photos, the latest upload and a
+    random preview. Takes two queries however many guests and photos there are.
+    """
+    # Subqueries rather than aggregates: with a GROUP BY the random preview would split the groups
+    photos = FileItem.objects.filter(user=OuterRef('pk'), file_type='image', uploaded=True, active=True)
+    owners = list(User.objects.select_related('profile').annotate(
+        photos=Subquery(photos.order_by().values('user').annotate(count=Count('id')).values('count'),
+                        output_field=IntegerField()),
+        latest_upload=Subquery(photos.order_by('-timestamp').values('timestamp')[:1]),
+        preview_id=Subquery(photos.order_by('?').values('id')[:1]),
+    ).filter(photos__gt=0).order_by('-latest_upload'))
+
+    previews = FileItem.objects.in_bulk([owner.preview_id for owner in owners])
+    return [{'owner': owner,
+             'photos': owner.photos,
+             'latest_upload': owner.latest_upload,
+             'preview': previews[owner.preview_id].gallery_thumbnail,
+             } for owner in owners]
+
+
+def get_gallery_index():
+    index = cache.get(CACHE_KEY)
+    if index is None:
+        index = build_gallery_index()
+        cache.set(CACHE_KEY, index, settings.PHOTOS_GALLERY_INDEX_TIMEOUT)
+    return index
+
+
+def invalidate_gallery_index():
+    cache.delete(CACHE_KEY)
+
+
+@receiver(post_save, sender=FileItem)
+@receiver(post_delete, sender=FileItem)
+@receiver(post_delete, sender=User)
+def gallery_changed(sender, instance, **kwargs):
+    # Photos edited or deleted from the admin and deleted guests. The upload, rendering and ingestion code paths
+    # change photos with QuerySet.update() and invalidate the index themselves.
+    invalidate_gallery_index()
@@ -0,0 +1,117 @@
+""" Ingestion of the uploaded photos: content hash, EXIF metadata and detection of duplicates. Needs Pillow, like
+photos.rendering.
+"""
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from PIL import Image
+from django.db import connections
+from django.db.models import OuterRef, Subquery
+from django.utils.timezone import make_aware, now
+
+from .gallery_index import invalidate_gallery_index
+from .models import FileItem
+from .renditions import get_rendition_storage
+
+logger = logging.getLogger(__name__)
+
+EXIF_IFD = 0x8769
+ORIENTATION = 0x0112
+DATETIME = 0x0132
+DATETIME_ORIGINAL = 0x9003
+
+# Fields set by ingest_pending from what it read of each photo
+INGESTED_FIELDS = ('content_hash', 'taken_at', 'width', 'height', 'orientation', 'duplicate_of')
+
+
+def parse_exif_datetime(value):
+    try:
+        return make_aware(datetime.strptime(value.strip('\x00 '), '%Y:%m:%d %H:%M:%S'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def inspect(path):
+    """ Reads the original at ``path`` once, returns its SHA-256 and what the EXIF data says about it.
+    Returns None if the storage can't be read.
+    """
+    storage = get_rendition_storage()
+    content_hash = hashlib.sha256()
+    try:
+        with storage.open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                content_hash.update(chunk)
+            info = {'content_hash': content_hash.hexdigest()}
+            f.seek(0)
+            try:
+                image = Image.open(f)
+                exif = image.getexif()
+            except (OSError, ValueError):
+                logger.warning('Could not read the EXIF data of {}'.format(path))
+                return info
+    except OSError:
+        logger.exception('Could not read the photo {}'.format(path))
+        return None
+
+    info['width'], info['height'] = image.size
+    info['orientation'] = exif.get(ORIENTATION)
+    info['taken_at'] = parse_exif_datetime(exif.get_ifd(EXIF_IFD).get(DATETIME_ORIGINAL)) or \
+        parse_exif_datetime(exif.get(DATETIME))
+    return info
+
+
+def pending_photos(limit=None):
+    photos = FileItem.objects.filter(file_type='image', uploaded=True, content_hash=None).exclude(
+        path=None).order_by('id')
+    return list(photos[:limit] if limit else photos)
+
+
+def ingest_pending(workers=2, limit=None):
+    """ Inspects the photos uploaded since the last run in a pool of processes. A photo with the same content as an
+    earlier one is linked to it with duplicate_of and shares its renditions; if both were uploaded by the same
+    guest, the copy is hidden from the galleries. Returns the number of photos ingested.
+    """
+    photos = pending_photos(limit)
+    if not photos:
+        return 0
+    paths = [photo.path for photo in photos]
+    if workers:
+        # Forked workers must not share the database connections of the parent
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(inspect, paths))
+    else:
+        results = [inspect(path) for path in paths]
+
+    # Photos that couldn't be read stay pending, to be retried on the next run
+    ingested = [(photo, info) for photo, info in zip(photos, results) if info is not None]
+    hashes = {info['content_hash'] for photo, info in ingested}
+    # Photos hidden or deleted by their guest aren't originals, the same photo uploaded again must be shown
+    originals = {}
+    for original in FileItem.objects.filter(content_hash__in=hashes, duplicate_of=None, active=True).order_by('-id'):
+        originals[original.content_hash] = original
+
+    duplicates, hidden = [], []
+    for photo, info in ingested:
+        for field, value in info.items():
+            if value is not None:
+                setattr(photo, field, value)
+        original = originals.setdefault(photo.content_hash, photo)
+        if original is not photo:
+            photo.duplicate_of = original
+            duplicates.append(photo.pk)
+            if photo.user_id == original.user_id:
+                hidden.append(photo.pk)
+
+    # The photos were loaded before reading them, render_photos may have stored their renditions meanwhile. Only the
+    # fields read here are written from them, the duplicates are changed with UPDATEs of their current rows.
+    FileItem.objects.bulk_update([photo for photo, info in ingested], INGESTED_FIELDS, batch_size=500)
+    if duplicates:
+        FileItem.objects.filter(id__in=duplicates, rendition_paths=None).update(rendition_paths=Subquery(
+            FileItem.objects.filter(pk=OuterRef('duplicate_of')).values('rendition_paths')[:1]))
+    if hidden:
+        FileItem.objects.filter(id__in=hidden).update(active=False, updated=now())
+        invalidate_gallery_index()
+    return len(ingested)
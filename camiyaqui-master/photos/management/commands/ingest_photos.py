@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Reads the metadata of the photos uploaded since the last run and links the duplicates. Renders them too " \
+           "when PHOTOS_LOCAL_RENDITIONS is set"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Number of processes, 0 to work in this process")
+        parser.add_argument('--limit', type=int, default=None, help="Photos processed per run")
+        parser.add_argument('--loop', action='store_true', default=False,
+                            help="Keep running and check for new photos every --interval seconds")
+        parser.add_argument('--interval', type=int, default=30)
+
+    def handle(self, *args, **options):
+        from photos.ingestion import ingest_pending
+        from photos.rendering import render_pending
+
+        while True:
+            ingested = ingest_pending(workers=options['workers'], limit=options['limit'])
+            rendered = 0
+            if settings.PHOTOS_LOCAL_RENDITIONS:
+                rendered = render_pending(workers=options['workers'], limit=options['limit'])
+            if ingested or rendered:
+                self.stdout.write('Ingested {} and rendered {} photos'.format(ingested, rendered))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
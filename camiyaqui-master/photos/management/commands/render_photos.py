@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Generates the renditions of the photos uploaded since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Number of rendering processes, 0 to render "
+                                                                   "in this process")
+        parser.add_argument('--limit', type=int, default=None, help="Photos rendered per run")
+        parser.add_argument('--loop', action='store_true', default=False,
+                            help="Keep running and check for new photos every --interval seconds")
+        parser.add_argument('--interval', type=int, default=30)
+
+    def handle(self, *args, **options):
+        if not settings.PHOTOS_LOCAL_RENDITIONS:
+            raise CommandError('Local renditions are disabled, set PHOTOS_LOCAL_RENDITIONS to enable them')
+        from photos.rendering import render_pending
+
+        while True:
+            rendered = render_pending(workers=options['workers'], limit=options['limit'])
+            if rendered:
+                self.stdout.write('Rendered {} photos'.format(rendered))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
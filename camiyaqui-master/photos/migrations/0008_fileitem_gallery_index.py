@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0007_auto_20190927_0506'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fileitem',
+            index=models.Index(fields=['user', 'file_type', 'uploaded', 'timestamp'], name='photos_file_user_id_c1759f_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0008_fileitem_gallery_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileitem',
+            name='rendition_paths',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def taken_at_from_upload(apps, schema_editor):
+    FileItem = apps.get_model('photos', 'FileItem')
+    FileItem.objects.update(taken_at=models.F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0009_fileitem_rendition_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileitem',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileitem',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='photos.FileItem'),
+        ),
+        migrations.AddField(
+            model_name='fileitem',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileitem',
+            name='orientation',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileitem',
+            name='taken_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='fileitem',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='fileitem',
+            index=models.Index(fields=['user', 'file_type', 'uploaded', 'taken_at'], name='photos_file_user_id_3c61e0_idx'),
+        ),
+        migrations.RunPython(taken_at_from_upload, migrations.RunPython.noop),
+    ]
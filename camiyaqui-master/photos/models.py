@@ -1,10 +1,11 @@
-import base64
-import json
-
 from django.conf import settings
 from django.db import models
+from django.utils.functional import cached_property
+from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 
+from photos.renditions import rendition_url, rendition_urls, local_rendition_urls
+
 
 class Album(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, null=False, on_delete=models.CASCADE)
@@ -29,78 +30,68 @@ class FileItem(models.Model):
     updated = models.DateTimeField(auto_now=True)
     uploaded = models.BooleanField(default=False)
     active = models.BooleanField(default=True)
+    rendition_paths = models.TextField(null=True, blank=True)  # JSON, set by the render_photos command
 
+    # Set by the ingest_photos command, see photos.ingestion
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    taken_at = models.DateTimeField(default=now, db_index=True)  # from the EXIF data, the upload time otherwise
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    orientation = models.PositiveSmallIntegerField(null=True, blank=True)  # EXIF orientation, 1 to 8
+    duplicate_of = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL,
+                                     related_name='duplicates')
 
+    class Meta:
+        indexes = [
+            # Pages of a gallery, see photos.pagination
+            models.Index(fields=['user', 'file_type', 'uploaded', 'timestamp']),
+            models.Index(fields=['user', 'file_type', 'uploaded', 'taken_at']),
+        ]
 
     @property
     def title(self):
         return str(self.name)
 
+    @classmethod
+    def file_type_for(cls, extension):
+        if extension in ('jpg', 'jpeg', 'png', 'bmp', 'gif'):
+            return 'image'
+        elif extension in ('mov', 'mp4', 'mpeg4', 'avi'):
+            return 'video'
+        elif extension in ('mp3', ):
+            return 'audio'
+        return None
+
     def save(self, **kwargs):
         if self.extension and not self.file_type:
-            if self.extension in ('jpg', 'jpeg', 'png', 'bmp', 'gif'):
-                self.file_type = 'image'
-            elif self.extension in ('mov', 'mp4', 'mpeg4', 'avi'):
-                self.file_type = 'video'
-            elif self.extension in ('mp3'):
-                self.file_type = 'audio'
-            else:
-                self.file_type = None
+            self.file_type = self.file_type_for(self.extension)
         super().save(**kwargs)
 
+    @property
+    def rendition_urls(self):
+        urls = rendition_urls(self.path)
+        urls.update(self.local_rendition_urls)
+        return urls
+
+    @cached_property
+    def local_rendition_urls(self):
+        return local_rendition_urls(self.rendition_paths)
+
+    def rendition(self, preset):
+        return self.local_rendition_urls.get(preset) or rendition_url(self.path, preset)
+
     @property
     def gallery_thumbnail(self):
-        edits = {
-            "resize": {
-                "width": 300,
-                "height": 300,
-                "fit": "outside"
-            }
-        }
-        data = {
-            'bucket': settings.AWS_BUCKET_NAME,
-            'key': self.path,
-            'edits': edits
-        }
-        data_str = json.dumps(data)
-        data_enc = base64.b64encode(data_str.encode('utf-8'))
-        return settings.RESIZE_API_ENDPOINT + '/' + data_enc.decode()
+        return self.rendition('gallery_thumbnail')
 
     @property
     def thumbnail(self):
-        edits = {
-            "resize": {
-                "width": 150,
-                "height": 150,
-                "fit": "outside"
-            }
-        }
-        data = {
-            'bucket': settings.AWS_BUCKET_NAME,
-            'key': self.path,
-            'edits': edits
-        }
-        data_str = json.dumps(data)
-        data_enc = base64.b64encode(data_str.encode('utf-8'))
-        return settings.RESIZE_API_ENDPOINT + '/' + data_enc.decode()
+        return self.rendition('thumbnail')
 
     @property
     def image(self):
-        edits = {
-            "resize": {
-                "width": 1024,
-                "height": 768,
-                "fit": "outside"
-            }
-        }
-        data = {
-            'bucket': settings.AWS_BUCKET_NAME,
-            'key': self.path,
-            'edits': edits
-        }
-        data_str = json.dumps(data)
-        data_enc = base64.b64encode(data_str.encode('utf-8'))
-        return settings.RESIZE_API_ENDPOINT + '/' + data_enc.decode()
+        return self.rendition('image')
+
 
 class Comment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -0,0 +1,40 @@
+import base64
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(item, field='timestamp'):
+    value = '{}|{}'.format(getattr(item, field).isoformat(), item.pk)
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode('utf-8')).decode('utf-8').split('|')
+        value, pk = parse_datetime(value), int(pk)
+    except (ValueError, UnicodeError):
+        raise InvalidCursor(cursor)
+    if value is None:
+        raise InvalidCursor(cursor)
+    return value, pk
+
+
+def keyset_page(queryset, cursor=None, size=None, field='timestamp'):
+    """ A page of photos, newest first by the datetime ``field``, starting after the photo of the cursor.
+    Seeking on (field, id) instead of using an OFFSET keeps every page an index range scan however deep the guest
+    scrolls. Returns the photos and the cursor of the next page, None on the last one.
+    """
+    size = size or settings.PHOTOS_PAGE_SIZE
+    queryset = queryset.order_by('-' + field, '-id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{field + '__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+    items = list(queryset[:size + 1])
+    next_cursor = encode_cursor(items[size - 1], field) if len(items) > size else None
+    return items[:size], next_cursor
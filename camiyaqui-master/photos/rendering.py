@@ -0,0 +1,98 @@
+""" Local rendition pipeline, enabled with PHOTOS_LOCAL_RENDITIONS. Renditions are generated with Pillow by the
+render_photos command.
+"""
+import io
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.core.files.base import ContentFile
+from django.db import connections
+
+from .gallery_index import invalidate_gallery_index
+from .models import FileItem
+from .renditions import PRESETS, get_rendition_storage
+
+logger = logging.getLogger(__name__)
+
+
+def rendition_path(path, preset):
+    stem, _ = os.path.splitext(path)
+    return '{}_{}.jpg'.format(stem, preset)
+
+
+def resize(image, width, height):
+    """ Scales the image down to the smallest size that covers width x height, like the resize API's
+    'outside' fit. Images are never scaled up.
+    """
+    scale = max(width / image.width, height / image.height)
+    if scale >= 1:
+        return image.copy()
+    return image.resize((math.ceil(image.width * scale), math.ceil(image.height * scale)), Image.LANCZOS)
+
+
+def render(path):
+    """ Generates the renditions of the original at ``path`` and stores them next to it.
+    Returns the path of each rendition, an empty dict if the original isn't an image Pillow can decode, or None
+    if the storage couldn't be read or written, to try again on the next run.
+    """
+    storage = get_rendition_storage()
+    try:
+        with storage.open(path, 'rb') as f:
+            image = ImageOps.exif_transpose(Image.open(f))
+            image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, ValueError):
+        logger.exception('Could not decode the photo {}'.format(path))
+        return {}
+    except OSError:
+        logger.exception('Could not read the photo {}'.format(path))
+        return None
+    image = image.convert('RGB')
+
+    paths = {}
+    try:
+        for preset, (width, height) in PRESETS.items():
+            buffer = io.BytesIO()
+            resize(image, width, height).save(buffer, 'JPEG', quality=85, optimize=True)
+            name = rendition_path(path, preset)
+            if storage.exists(name):
+                storage.delete(name)
+            paths[preset] = storage.save(name, ContentFile(buffer.getvalue()))
+    except OSError:
+        logger.exception('Could not store the renditions of {}'.format(path))
+        return None
+    return paths
+
+
+def pending_photos(limit=None):
+    photos = FileItem.objects.filter(file_type='image', uploaded=True, active=True, rendition_paths=None).exclude(
+        path=None).order_by('id').values_list('id', 'path')
+    return list(photos[:limit] if limit else photos)
+
+
+def render_pending(workers=2, limit=None):
+    """ Renders the photos uploaded since the last run in a pool of processes. The workers only touch the
+    storage; the paths are recorded by this process once the batch is done. Returns the number of photos rendered.
+    """
+    photos = pending_photos(limit)
+    if not photos:
+        return 0
+    ids, paths = zip(*photos)
+    if workers:
+        # Forked workers must not share the database connections of the parent
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render, paths))
+    else:
+        results = [render(path) for path in paths]
+
+    # Photos that can't be decoded are recorded with no renditions, so they aren't retried on every run. Those that
+    # failed because of the storage stay pending.
+    items = [FileItem(id=pk, rendition_paths=json.dumps(result)) for pk, result in zip(ids, results)
+             if result is not None]
+    FileItem.objects.bulk_update(items, ['rendition_paths'], batch_size=500)
+    invalidate_gallery_index()
+    return sum(1 for result in results if result)
@@ -0,0 +1,59 @@
+import base64
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import get_storage_class
+
+# Size of each rendition of a photo, served by the resize API
+PRESETS = {
+    'gallery_thumbnail': (300, 300),
+    'thumbnail': (150, 150),
+    'image': (1024, 768),
+}
+
+
+@lru_cache(maxsize=8192)
+def _encode(endpoint, bucket, path, width, height):
+    data = {
+        'bucket': bucket,
+        'key': path,
+        'edits': {
+            'resize': {
+                'width': width,
+                'height': height,
+                'fit': 'outside'
+            }
+        }
+    }
+    return endpoint + '/' + base64.b64encode(json.dumps(data).encode('utf-8')).decode()
+
+
+def rendition_url(path, preset):
+    """ The URL of a photo resized to one of the PRESETS. URLs are encoded once per path and kept in memory; a
+    photo whose path changes gets a new URL since the path is part of the key.
+    """
+    width, height = PRESETS[preset]
+    return _encode(settings.RESIZE_API_ENDPOINT, settings.AWS_BUCKET_NAME, path, width, height)
+
+
+def rendition_urls(path):
+    return {preset: rendition_url(path, preset) for preset in PRESETS}
+
+
+@lru_cache(maxsize=None)
+def _storage(storage_class):
+    return get_storage_class(storage_class)()
+
+
+def get_rendition_storage():
+    """ The storage holding the originals and the local renditions, PHOTOS_RENDITION_STORAGE or the default one. """
+    return _storage(settings.PHOTOS_RENDITION_STORAGE)
+
+
+def local_rendition_urls(rendition_paths):
+    """ The URLs of the renditions generated by the render_photos command, from FileItem.rendition_paths. """
+    if not settings.PHOTOS_LOCAL_RENDITIONS or not rendition_paths:
+        return {}
+    storage = get_rendition_storage()
+    return {preset: storage.url(path) for preset, path in json.loads(rendition_paths).items()}
@@ -0,0 +1,32 @@
+import threading
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+from camiyaqui.settings.aws_credentials import AWS_ACCESS_KEY_ID, AWS_BUCKET_REGION, AWS_SECRET_ACCESS_KEY
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_s3_client():
+    """ The S3 client shared by all the requests of the process. It's created on first use, since resolving the
+    credentials and loading the service model is slow; boto3 clients are thread safe once created.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = boto3.client('s3',
+                                       region_name=AWS_BUCKET_REGION,
+                                       aws_access_key_id=AWS_ACCESS_KEY_ID,
+                                       aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                                       config=Config(max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS))
+    return _client
+
+
+def reset_s3_client():
+    global _client
+    with _lock:
+        _client = None
@@ -0,0 +1,14 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class BatchPolicySerializer(serializers.Serializer):
+    """ The files a guest is about to upload, sent as repeated form fields or as a list in a JSON body. """
+    filenames = serializers.ListField(child=serializers.CharField(max_length=120), allow_empty=False,
+                                      max_length=settings.PHOTOS_UPLOAD_BATCH_MAX)
+
+
+class BatchCompleteSerializer(serializers.Serializer):
+    """ The files a guest finished uploading to the bucket. """
+    file_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False,
+                                     max_length=settings.PHOTOS_UPLOAD_BATCH_MAX)
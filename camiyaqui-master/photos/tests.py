@@ -1,3 +1,272 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from photos.ingestion import ingest_pending, inspect
+from photos.gallery_index import CACHE_KEY, get_gallery_index, invalidate_gallery_index
+from photos.models import FileItem
+from photos.pagination import keyset_page, InvalidCursor
+from photos.rendering import render_pending
+from photos.s3 import reset_s3_client
+from photos.renditions import _encode
+
+
+class TestRenditions(SimpleTestCase):
+    def test_rendition_url(self):
+        photo = FileItem(path='photos/1/a.jpg')
+        endpoint, encoded = photo.thumbnail.rsplit('/', 1)
+        data = json.loads(base64.b64decode(encoded))
+        self.assertEqual(data['key'], 'photos/1/a.jpg')
+        self.assertEqual(data['edits']['resize'], {'width': 150, 'height': 150, 'fit': 'outside'})
+        self.assertEqual(set(photo.rendition_urls), {'gallery_thumbnail', 'thumbnail', 'image'})
+
+    def test_encoded_once(self):
+        _encode.cache_clear()
+        photo = FileItem(path='photos/1/b.jpg')
+        photo.image, photo.image
+        self.assertEqual(_encode.cache_info().misses, 1)
+        photo.path = 'photos/1/c.jpg'
+        self.assertEqual(json.loads(base64.b64decode(photo.image.rsplit('/', 1)[1]))['key'], 'photos/1/c.jpg')
+        self.assertEqual(_encode.cache_info().misses, 2)
+
+
+class TestGalleryIndex(TestCase):
+    def setUp(self):
+        cache.delete(CACHE_KEY)
+        for i in range(3):
+            user = User.objects.create(username='guest{}'.format(i))
+            FileItem.objects.bulk_create([
+                FileItem(user=user, path='{}/{}.jpg'.format(i, n), file_type='image', uploaded=True) for n in range(5)
+            ])
+        User.objects.create(username='no-photos')
+
+    def test_constant_queries(self):
+        with self.assertNumQueries(2):
+            galleries = get_gallery_index()
+        self.assertEqual([gallery['photos'] for gallery in galleries], [5, 5, 5])
+        with self.assertNumQueries(0):
+            get_gallery_index()
+        invalidate_gallery_index()
+        with self.assertNumQueries(2):
+            get_gallery_index()
+
+    def test_invalidated_when_photos_change(self):
+        self.assertEqual([gallery['photos'] for gallery in get_gallery_index()], [5, 5, 5])
+        FileItem.objects.filter(user__username='guest0').first().delete()
+        photo = FileItem.objects.filter(user__username='guest1').first()
+        photo.active = False
+        photo.save()
+        User.objects.get(username='guest2').delete()
+        self.assertEqual(sorted(gallery['photos'] for gallery in get_gallery_index()), [4, 4])
+
+
+class TestKeysetPage(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='guest')
+        timestamp = now()
+        FileItem.objects.bulk_create([FileItem(user=user, file_type='image', uploaded=True) for n in range(5)])
+        # Photos uploaded in the same instant are ordered by id
+        FileItem.objects.update(timestamp=timestamp)
+
+    def test_pages(self):
+        images, seen, cursor = FileItem.objects.all(), [], None
+        while True:
+            page, cursor = keyset_page(images, cursor, size=2)
+            seen.extend(image.id for image in page)
+            if not cursor:
+                break
+        self.assertEqual(seen, list(FileItem.objects.order_by('-id').values_list('id', flat=True)))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            keyset_page(FileItem.objects.all(), 'not a cursor')
+
+
+class TestS3Client(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='guest')
+        self.client.force_login(self.user)
+        reset_s3_client()
+        self.addCleanup(reset_s3_client)
+
+    @mock.patch('photos.s3.boto3.client')
+    def test_client_reused(self, client):
+        client.return_value.generate_presigned_post.return_value = {'url': 'https://bucket', 'fields': {}}
+        for n in range(3):
+            response = self.client.post(reverse('upload-policy'), {'filename': 'photo{}.jpg'.format(n)})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.call_count, 1)
+        self.assertEqual(client.return_value.generate_presigned_post.call_count, 3)
+
+
+class TestBatchUploads(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='guest')
+        self.client.force_login(self.user)
+        reset_s3_client()
+        self.addCleanup(reset_s3_client)
+
+    @mock.patch('photos.s3.boto3.client')
+    def test_batch_policy(self, client):
+        client.return_value.generate_presigned_post.return_value = {'url': 'https://bucket', 'fields': {}}
+        names = ['photo{}.jpg'.format(n) for n in range(20)] + ['song.mp3', 'README']
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse('upload-batch-policy'), {'filenames': names})
+        files = response.json()['files']
+        self.assertEqual(len(files), 22)
+        items = FileItem.objects.in_bulk([f['file_id'] for f in files])
+        self.assertEqual(items[files[0]['file_id']].path, 'guest/{0}/{0}.jpg'.format(files[0]['file_id']))
+        self.assertEqual(items[files[0]['file_id']].file_type, 'image')
+        self.assertEqual(items[files[20]['file_id']].file_type, 'audio')
+        self.assertEqual(items[files[21]['file_id']].path, 'guest/{0}/{0}'.format(files[21]['file_id']))
+
+        other = FileItem.objects.create(user=User.objects.create(username='other'))
+        response = self.client.post(reverse('upload-batch-complete'),
+                                    {'file_ids': [f['file_id'] for f in files] + [other.pk]})
+        self.assertEqual(response.json(), {'uploaded': 22, 'missing': 1})
+        self.assertFalse(FileItem.objects.get(pk=other.pk).uploaded)
+
+    def test_batch_complete_json(self):
+        mine = FileItem.objects.create(user=self.user)
+        response = self.client.post(reverse('upload-batch-complete'), {'file_ids': [mine.pk]},
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {'uploaded': 1, 'missing': 0})
+        for data in ({'file_ids': []}, {}, {'file_ids': ['one']}, {'file_ids': mine.pk}):
+            with self.subTest(data=data):
+                response = self.client.post(reverse('upload-batch-complete'), data, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_complete_single_update(self):
+        mine = FileItem.objects.create(user=self.user)
+        other = FileItem.objects.create(user=User.objects.create(username='other'))
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('upload-complete'), {'file': mine.pk})
+        self.assertEqual(response.json(), {'id': mine.pk, 'saved': True})
+        self.assertGreater(FileItem.objects.get(pk=mine.pk).updated, mine.updated)
+        response = self.client.post(reverse('upload-complete'), {'file': other.pk})
+        self.assertEqual(response.json(), {'id': other.pk, 'saved': False})
+        self.assertFalse(FileItem.objects.get(pk=other.pk).uploaded)
+
+
+class TestLocalRenditions(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root, MEDIA_URL='/media/', PHOTOS_LOCAL_RENDITIONS=True,
+                                     PHOTOS_RENDITION_STORAGE='django.core.files.storage.FileSystemStorage')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1000), 'white').save(buffer, 'JPEG')
+        default_storage.save('guest/1/1.jpg', ContentFile(buffer.getvalue()))
+        default_storage.save('guest/2/2.jpg', ContentFile(b'not a photo'))
+        user = User.objects.create(username='guest')
+        self.photo = FileItem.objects.create(user=user, path='guest/1/1.jpg', file_type='image', uploaded=True)
+        self.broken = FileItem.objects.create(user=user, path='guest/2/2.jpg', file_type='image', uploaded=True)
+
+    def test_render(self):
+        self.assertEqual(render_pending(workers=1), 1)
+        photo = FileItem.objects.get(pk=self.photo.pk)
+        self.assertEqual(photo.thumbnail, '/media/guest/1/1_thumbnail.jpg')
+        with default_storage.open('guest/1/1_image.jpg') as f:
+            self.assertEqual(Image.open(f).size, (1536, 768))
+        # Photos that can't be rendered keep using the resize API and are not retried
+        self.assertTrue(FileItem.objects.get(pk=self.broken.pk).thumbnail.startswith(settings.RESIZE_API_ENDPOINT))
+        self.assertEqual(render_pending(workers=0), 0)
+
+    def test_storage_errors_retried(self):
+        with mock.patch.object(FileSystemStorage, 'open', side_effect=OSError('Connection reset')), \
+                self.assertLogs('photos.rendering', 'ERROR'):
+            self.assertEqual(render_pending(workers=0), 0)
+        self.assertIsNone(FileItem.objects.get(pk=self.photo.pk).rendition_paths)
+        self.assertEqual(render_pending(workers=0), 1)
+
+
+class TestIngestion(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root,
+                                      PHOTOS_RENDITION_STORAGE='django.core.files.storage.FileSystemStorage')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        image = Image.new('RGB', (640, 480), 'white')
+        exif = image.getexif()
+        exif[0x0112] = 6
+        exif[0x0132] = '2020:02:29 18:30:00'
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        self.guest, other = User.objects.create(username='guest'), User.objects.create(username='other')
+        self.photos = []
+        for n, user in enumerate((self.guest, self.guest, other)):
+            path = default_storage.save('{}/{}.jpg'.format(user.username, n), ContentFile(buffer.getvalue()))
+            self.photos.append(FileItem.objects.create(user=user, path=path, file_type='image', uploaded=True))
+
+    def test_ingest(self):
+        self.assertEqual(ingest_pending(workers=1), 3)
+        original, copy, shared = FileItem.objects.order_by('id')
+        self.assertEqual((original.width, original.height, original.orientation), (640, 480, 6))
+        self.assertEqual(original.taken_at.year, 2020)
+        self.assertEqual(len(original.content_hash), 64)
+        self.assertEqual(copy.duplicate_of, original)
+        self.assertFalse(copy.active)
+        # The same photo uploaded by another guest stays in their gallery
+        self.assertEqual(shared.duplicate_of, original)
+        self.assertTrue(shared.active)
+        self.assertEqual(ingest_pending(workers=0), 0)
+
+    def test_renditions_stored_meanwhile_kept(self):
+        renditions = json.dumps({'thumbnail': 'guest/0_thumbnail.jpg'})
+
+        def render_then_inspect(path):
+            # render_photos stores the renditions of the first photo while it is being read
+            FileItem.objects.filter(pk=self.photos[0].pk).update(rendition_paths=renditions)
+            return inspect(path)
+
+        with mock.patch('photos.ingestion.inspect', side_effect=render_then_inspect):
+            ingest_pending(workers=0)
+        original, copy, shared = FileItem.objects.order_by('id')
+        self.assertEqual(original.rendition_paths, renditions)
+        self.assertEqual(copy.rendition_paths, renditions)
+        self.assertTrue(original.active)
+
+    def test_storage_errors_retried(self):
+        with mock.patch.object(FileSystemStorage, 'open', side_effect=OSError('Connection reset')), \
+                self.assertLogs('photos.ingestion', 'ERROR'):
+            self.assertEqual(ingest_pending(workers=0), 0)
+        self.assertFalse(FileItem.objects.exclude(content_hash=None).exists())
+        self.assertEqual(ingest_pending(workers=0), 3)
+
+    def test_upload_again_after_hiding(self):
+        ingest_pending(workers=0)
+        FileItem.objects.filter(user=self.guest).update(active=False)
+        with default_storage.open(self.photos[0].path) as f:
+            path = default_storage.save('guest/again.jpg', ContentFile(f.read()))
+        again = FileItem.objects.create(user=self.guest, path=path, file_type='image', uploaded=True)
+        self.assertEqual(ingest_pending(workers=0), 1)
+        again.refresh_from_db()
+        self.assertIsNone(again.duplicate_of)
+        self.assertTrue(again.active)
+
+    def test_sort_by_taken_at(self):
+        FileItem.objects.filter(pk=self.photos[0].pk).update(taken_at=now().replace(year=2000))
+        page, cursor = keyset_page(FileItem.objects.filter(user=self.guest), size=1, field='taken_at')
+        self.assertEqual(page, [self.photos[1]])
+        page, cursor = keyset_page(FileItem.objects.filter(user=self.guest), cursor, size=1, field='taken_at')
+        self.assertEqual(page, [self.photos[0]])
+        self.assertIsNone(cursor)
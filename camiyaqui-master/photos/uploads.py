@@ -0,0 +1,65 @@
+import os
+import uuid
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from camiyaqui.settings.aws_credentials import AWS_BUCKET_NAME
+from .gallery_index import invalidate_gallery_index
+from .models import FileItem
+from .s3 import get_s3_client
+
+
+def create_uploads(user, filenames, album=None):
+    """ Creates the FileItems of the photos a guest is about to upload, with one INSERT for all of them and
+    one UPDATE to store their paths, which include the id of each item.
+    """
+    items = []
+    for filename in filenames:
+        extension = os.path.splitext(filename)[1][1:]
+        items.append(FileItem(user=user, album=album, name=filename, extension=extension,
+                              file_type=FileItem.file_type_for(extension)))
+
+    # A temporary path tags the rows, to find them again on databases that don't return the ids of bulk_create
+    for item in items:
+        item.path = 'pending/{}'.format(uuid.uuid4().hex)
+    with transaction.atomic():
+        FileItem.objects.bulk_create(items)
+        if items and items[0].pk is None:
+            ids = dict(FileItem.objects.filter(path__in=[item.path for item in items]).values_list('path', 'id'))
+            for item in items:
+                item.pk = ids[item.path]
+
+        for item in items:
+            item.path = upload_path(user, item)
+        FileItem.objects.bulk_update(items, ['path'])
+    return items
+
+
+def upload_path(user, item):
+    return f"{user.username}/{item.pk}/{item.pk}" + (f".{item.extension}" if item.extension else "")
+
+
+def presigned_post(item):
+    """ The policy for the browser or the app to upload a photo straight to the bucket. """
+    return get_s3_client().generate_presigned_post(
+        Bucket=AWS_BUCKET_NAME,
+        Key=item.path,
+        Fields={"acl": "private", "Content-Type": ""},
+        Conditions=[
+            {"acl": "private"},
+            {"Content-Type": ""}
+        ],
+        ExpiresIn=3600
+    )
+
+
+def complete_uploads(user, ids):
+    """ Marks the photos of a guest as uploaded with a single UPDATE. Ids of photos that don't exist or belong to
+    someone else are left out by the same query. Returns how many photos were marked.
+    """
+    # QuerySet.update() doesn't set the auto_now fields
+    updated = FileItem.objects.filter(id__in=ids, user=user).update(uploaded=True, updated=now())
+    if updated:
+        invalidate_gallery_index()
+    return updated
@@ -1,12 +1,11 @@
 import hashlib
 import hmac
 import logging
-import os
-import random
 
-import boto3
 from django.contrib.auth.models import User
-from django.shortcuts import render
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import DetailView, CreateView
 from django.views.generic.base import View
@@ -14,14 +13,12 @@ from rest_framework import permissions, status, authentication
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from camiyaqui.settings.aws_credentials import (
-    AWS_ACCESS_KEY_ID,
-    AWS_BUCKET_NAME,
-    AWS_BUCKET_REGION,
-    AWS_SECRET_ACCESS_KEY,
-)
 from ourwedding.mixins import GuestMixin
+from .gallery_index import get_gallery_index
 from .models import FileItem, Album
+from .pagination import keyset_page, InvalidCursor
+from .serializers import BatchPolicySerializer, BatchCompleteSerializer
+from .uploads import create_uploads, presigned_post, complete_uploads
 
 logger = logging.getLogger(__name__)
 
@@ -42,54 +39,40 @@ class FilePolicyAPI(APIView):
         Session Authentication but any auth should work.
         """
         filename_req = request.data.get('filename')
-        album_pk = request.data.get('album_pk', None)
-        if album_pk:
-            try:
-                album = Album.objects.get(id=album_pk)
-            except Album.DoesNotExist:
-                album = None
-
-        s3 = boto3.client('s3',
-                          region_name=AWS_BUCKET_REGION,
-                          aws_access_key_id=AWS_ACCESS_KEY_ID,
-                          aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
-
         if not filename_req:
             return Response({"message": "A filename is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = request.user
-        username_str = str(request.user.username)
-
-        file_obj = FileItem.objects.create(user=user, name=filename_req, album=album)
-        file_obj_id = file_obj.id
-        upload_start_path = f"{username_str}/{file_obj_id}/"
+        file_obj = create_uploads(request.user, [filename_req], album=get_album(request))[0]
+        data = {'policy': presigned_post(file_obj),
+                'file_id': file_obj.id
+                }
 
-        _, file_extension = os.path.splitext(filename_req)
-        filename_final = f"{file_obj_id}{file_extension}"
+        return Response(data, status=status.HTTP_200_OK)
 
-        final_upload_path = f"{upload_start_path}{filename_final}"
 
-        file_obj.path = final_upload_path
-        file_obj.extension = file_extension[1:]
-        file_obj.save()
+class BatchFilePolicyAPI(APIView):
+    """ The upload policies of several files at once, for guests uploading many photos from the gallery. """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [authentication.SessionAuthentication]
 
+    def post(self, request, *args, **kwargs):
+        serializer = BatchPolicySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        presigned_post = s3.generate_presigned_post(
-            Bucket=AWS_BUCKET_NAME,
-            Key=final_upload_path,
-            Fields={"acl": "private", "Content-Type": ""},
-            Conditions=[
-                {"acl": "private"},
-                {"Content-Type": ""}
-            ],
-            ExpiresIn=3600
-        )
+        files = create_uploads(request.user, serializer.validated_data['filenames'], album=get_album(request))
+        data = {'files': [{'policy': presigned_post(file_obj), 'file_id': file_obj.id} for file_obj in files]}
+        return Response(data, status=status.HTTP_200_OK)
 
-        data = {'policy': presigned_post,
-                'file_id': file_obj_id
-                }
 
-        return Response(data, status=status.HTTP_200_OK)
+def get_album(request):
+    album_pk = request.data.get('album_pk', None)
+    if album_pk:
+        try:
+            return Album.objects.get(id=album_pk)
+        except Album.DoesNotExist:
+            pass
+    return None
 
 
 class FileUploadCompleteHandler(APIView):
@@ -99,17 +82,30 @@ class FileUploadCompleteHandler(APIView):
     def post(self, request, *args, **kwargs):
         file_id = request.POST.get('file')
         data = {}
-        type_ = request.POST.get('fileType')
         if file_id:
-            obj = FileItem.objects.get(id=int(file_id))
-            obj.uploaded = True
-            obj.type = type_
-            obj.save()
-            data['id'] = obj.id
-            data['saved'] = True
+            try:
+                file_id = int(file_id)
+            except ValueError:
+                return Response({"message": "Invalid file id"}, status=status.HTTP_400_BAD_REQUEST)
+            data['id'] = file_id
+            data['saved'] = bool(complete_uploads(request.user, [file_id]))
         return Response(data, status=status.HTTP_200_OK)
 
 
+class BatchUploadCompleteHandler(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [authentication.SessionAuthentication]
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchCompleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        file_ids = set(serializer.validated_data['file_ids'])
+        uploaded = complete_uploads(request.user, file_ids)
+        return Response({'uploaded': uploaded, 'missing': len(file_ids) - uploaded}, status=status.HTTP_200_OK)
+
+
 def sign(key, msg):
     return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
 
@@ -124,30 +120,38 @@ def getSignatureKey(key, date_stamp, regionName, serviceName):
 
 class GalleryList(GuestMixin, View):
     def get(self, request):
-        gallery_users = FileItem.objects.values('user').distinct()
-        galleries = []
-        for user_dict in gallery_users:
-            user = User.objects.get(id=user_dict['user'])
-            img_preview = random.choice(FileItem.objects.filter(user=user).all())
-            preview = img_preview.gallery_thumbnail
-            gallery = {'owner': user,
-                       'preview': preview
-                       }
-            galleries.append(gallery)
+        return render(request, 'photos/galleries.html', {'galleries': get_gallery_index()})
+
+
+# Orders of the galleries other than the upload time, for ?sort=
+SORT_FIELDS = {'taken': 'taken_at'}
 
-        return render(request, 'photos/galleries.html', {'galleries': galleries})
+
+def render_gallery(request, title, images):
+    """ Renders a page of a gallery, or only its photos as JSON when the page is loaded by the infinite scroll. """
+    sort = request.GET.get('sort')
+    try:
+        page, next_cursor = keyset_page(images.filter(active=True), request.GET.get('cursor'),
+                                        field=SORT_FIELDS.get(sort, 'timestamp'))
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    if request.is_ajax():
+        return JsonResponse({'html': render_to_string('photos/gallery_items.html', {'images': page}, request),
+                             'next': next_cursor})
+    gallery = {'title': title,
+               'images': page,
+               'preview': page[0] if page else None,
+               'next': next_cursor,
+               'sort': sort if sort in SORT_FIELDS else None,
+               }
+    return render(request, 'photos/gallery.html', {'gallery': gallery})
 
 
 class GalleryView(GuestMixin, View):
     def get(self, request, pk):
-        user = User.objects.get(pk=pk)
-        images = FileItem.objects.filter(file_type='image', uploaded=True).filter(user=user)
-        title = _("Image Gallery by {}").format(user.profile)
-        gallery = {'title': title,
-                   'images': images,
-                    'preview': images.first()
-                   }
-        return render(request, 'photos/gallery.html', {'gallery': gallery})
+        user = get_object_or_404(User.objects.select_related('profile'), pk=pk)
+        images = FileItem.objects.filter(user=user, file_type='image', uploaded=True)
+        return render_gallery(request, _("Image Gallery by {}").format(user.profile), images)
 
 
 class AlbumNew(GuestMixin, CreateView):
@@ -165,7 +169,8 @@ class AlbumAdd(GuestMixin, DetailView):
     model = Album
     context_object_name = 'album'
 
-class AlbumView(GuestMixin, DetailView):
-    template_name = 'photos/gallery.html'
-    model = Album
-    context_object_name = 'gallery'
+class AlbumView(GuestMixin, View):
+    def get(self, request, pk):
+        album = get_object_or_404(Album, pk=pk)
+        images = FileItem.objects.filter(album=album, file_type='image', uploaded=True)
+        return render_gallery(request, album.name, images)